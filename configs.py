@@ -9,6 +9,13 @@ configs = {
     "show_piece_moves": True,
     "show_team_moves": False,
     "show_last_move": True,
+    "frame_rate": 60,               # most frames drawn a second, the loop sleeps out the rest
+
+    # engine configs
+    "engine_colors": [],            # the colors played by the engine, eg. ["black"]
+    "engine_time": 1.0,             # seconds the engine may think for each move
+    "engine_hash_size": 16,         # transposition table size in megabytes
+    "move_cache_size": 8,           # legal move cache size in megabytes, 0 for none
 
     # player index
     "player_tags":
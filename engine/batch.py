@@ -0,0 +1,269 @@
+import numpy as np
+from factory import Factory
+from models.bitboard import COLOR_IDX, KINDS, KIND_IDX, WRAP, WHITE, BLACK, KNIGHT, BISHOP, ROOK, QUEEN, bits
+from models.chess import Chess
+from models.evaluation import ENDGAME_SCORES, MAX_PHASE, MIDDLEGAME_SCORES, PHASE_WEIGHTS
+from models.geometry import SIZE, SQUARES, DIAGONAL_DIRECTIONS, DIRECTIONS, KNIGHT_STEPS, ORTHOGONAL_DIRECTIONS
+
+"""
+Batches of positions are stored as (N, PLANES, SIZE, SIZE) uint8 arrays, one plane per
+(colour, kind) at index colour * len(KINDS) + kind, the same order as Chess.state(), and
+indexed [y][x] like Chess.board. Internally every plane is packed into a uint64 bitboard
+so whole batches can be shifted and masked at once, which needs SIZE <= 8
+"""
+PLANES = 2 * len(KINDS)
+
+# centipawns for each square a piece can move to, indexed by KINDS
+MOBILITY_WEIGHTS = [0, 1, 5, 4, 2, 0]
+
+# the phase weight of each plane
+PHASE_PLANES = np.array(PHASE_WEIGHTS * 2, dtype=np.int64)
+
+
+def _byte_scores() -> np.ndarray:
+    """
+    Builds a lookup of the piece-square score for every possible byte of every plane, so a
+    bitboard is scored 8 squares at a time. Middlegame and endgame are packed into one int64
+    as middlegame * 2 ** 32 + endgame so both are summed by a single lookup
+    :return: (PLANES * 8, 256) int64, indexed [plane * 8 + byte][value]
+    """
+    scores = np.zeros((PLANES, 8 * 8), dtype=np.int64)
+    for color in range(2):
+        for kind in range(len(KINDS)):
+            plane = color * len(KINDS) + kind
+            scores[plane, :SQUARES] = [(MIDDLEGAME_SCORES[color][kind][sq] << 32) + ENDGAME_SCORES[color][kind][sq]
+                                       for sq in range(SQUARES)]
+    # value_bits[value][bit] is 1 when the bit is set in the byte value
+    value_bits = (np.arange(256)[:, None] >> np.arange(8)) & 1
+    return np.einsum("vb,pyb->pyv", value_bits, scores.reshape(PLANES, 8, 8)).reshape(PLANES * 8, 256)
+
+
+# packed piece-square scores by plane byte and byte value, each row is small enough to stay in cache
+BYTE_SCORES = _byte_scores()
+
+# bitboard.WRAP as uint64 scalars
+_WRAP = {dx: np.uint64(mask) for dx, mask in WRAP.items()}
+
+
+def shift(boards: np.ndarray,
+          dx: int,
+          dy: int) -> np.ndarray:
+    """
+    Vectorised bitboard.shift, moves every bit dx columns and dy rows, dropping any that leave the board
+    :param boards: uint64 bitboards of any shape
+    :param dx: the column offset
+    :param dy: the row offset
+    :return: np.ndarray
+    """
+    amount = dy * SIZE + dx
+    if amount > 0:
+        boards = boards << np.uint64(amount)
+    else:
+        boards = boards >> np.uint64(-amount)
+    return boards & _WRAP[dx]
+
+
+def slide(sliders: np.ndarray,
+          empty: np.ndarray,
+          dx: int,
+          dy: int) -> np.ndarray:
+    """
+    Returns the squares attacked by the given sliding pieces in one direction, up to and including
+    the first blocker. Uses a Kogge-Stone fill, which slides 1, 2 then 4 squares at a time
+    :param sliders: uint64 bitboards of the sliding pieces
+    :param empty: uint64 bitboards of the empty squares, broadcast against sliders
+    :param dx: the column step
+    :param dy: the row step
+    :return: np.ndarray
+    """
+    amount = dy * SIZE + dx
+    move = np.left_shift if amount > 0 else np.right_shift
+    amount = abs(amount)
+
+    # squares a slider can pass through without wrapping around the board edge
+    passable = empty & _WRAP[dx]
+    sliders = sliders.copy()
+    moved = np.empty_like(sliders)
+    for step in (1, 2, 4):
+        move(sliders, np.uint64(amount * step), out=moved)
+        moved &= passable
+        sliders |= moved
+        if step < 4:
+            passable = passable & move(passable, np.uint64(amount * step))
+
+    # one more step takes in the blocker
+    move(sliders, np.uint64(amount), out=moved)
+    moved &= _WRAP[dx]
+    return moved
+
+
+def popcount(boards: np.ndarray) -> np.ndarray:
+    """
+    Counts the bits set in each bitboard
+    :param boards: uint64 bitboards of any shape
+    :return: np.ndarray
+    """
+    return np.bitwise_count(boards).astype(np.int64)
+
+
+def bitboards_from_planes(planes: np.ndarray) -> np.ndarray:
+    """
+    Packs (N, PLANES, SIZE, SIZE) planes into (N, PLANES) uint64 bitboards
+    :param planes: the given planes
+    :return: np.ndarray
+    """
+    count = len(planes)
+    packed = np.zeros((count, PLANES, 8), dtype=np.uint8)
+    packed[:, :, :(SQUARES + 7) // 8] = np.packbits(planes.reshape(count, PLANES, SQUARES),
+                                                    axis=2, bitorder="little")
+    return packed.view("<u8").reshape(count, PLANES).astype(np.uint64)
+
+
+def planes_from_bitboards(boards: np.ndarray) -> np.ndarray:
+    """
+    Unpacks (N, PLANES) uint64 bitboards into (N, PLANES, SIZE, SIZE) planes
+    :param boards: the given bitboards
+    :return: np.ndarray
+    """
+    count = len(boards)
+    unpacked = np.unpackbits(boards.astype("<u8").view(np.uint8).reshape(count, PLANES, 8),
+                             axis=2, count=SQUARES, bitorder="little")
+    return unpacked.reshape(count, PLANES, SIZE, SIZE)
+
+
+def bitboards_from_chess(positions: [Chess]) -> (np.ndarray, np.ndarray):
+    """
+    Packs the given positions into a batch of bitboards, skipping the planes
+    :param positions: the given positions
+    :return: ((N, PLANES) uint64 bitboards, side to move colour indices)
+    """
+    boards = np.array([chess.state()[0] for chess in positions], dtype=np.uint64).reshape(-1, PLANES)
+    turns = np.array([COLOR_IDX[chess.turn] for chess in positions], dtype=np.uint8)
+    return boards, turns
+
+
+def planes_from_chess(positions: [Chess]) -> (np.ndarray, np.ndarray):
+    """
+    Packs the given positions into a batch
+    :param positions: the given positions
+    :return: (planes, side to move colour indices)
+    """
+    boards, turns = bitboards_from_chess(positions)
+    return planes_from_bitboards(boards), turns
+
+
+def planes_from_fens(fens: [str],
+                     factory: Factory = None) -> (np.ndarray, np.ndarray):
+    """
+    Packs the given FENs into a batch, reading each board through the factory
+    :param fens: the given FENs
+    :param factory: the factory to read the boards with, a new one if not given
+    :return: (planes, side to move colour indices)
+    """
+    if not factory:
+        factory = Factory()
+    planes = np.zeros((len(fens), PLANES, SIZE, SIZE), dtype=np.uint8)
+    turns = np.zeros(len(fens), dtype=np.uint8)
+
+    for idx, fen in enumerate(fens):
+        fields = fen.split()
+        for y, row in enumerate(factory.create_board(fields[0])):
+            for x, piece in enumerate(row):
+                if piece:
+                    planes[idx, COLOR_IDX[piece.color] * len(KINDS) + KIND_IDX[piece.key], y, x] = 1
+        if len(fields) > 1 and fields[1] == "b":
+            turns[idx] = BLACK
+    return planes, turns
+
+
+def mobility(boards: np.ndarray) -> np.ndarray:
+    """
+    Scores the squares each knight, bishop, rook and queen can move to, white minus black
+    :param boards: (N, PLANES) uint64 bitboards
+    :return: np.ndarray
+    """
+    kinds = len(KINDS)
+    occupied = np.bitwise_or.reduce(boards.reshape(len(boards), 2, kinds), axis=2).T
+    empty = ~(occupied[WHITE] | occupied[BLACK])
+    not_own = ~occupied
+
+    # each knight jump is its own shift, so knights sharing a target square are each counted
+    knights = boards[:, [WHITE * kinds + KNIGHT, BLACK * kinds + KNIGHT]].T
+    counts = np.zeros(knights.shape, dtype=np.uint16)
+    for dx, dy in KNIGHT_STEPS:
+        counts += np.bitwise_count(shift(knights, dx, dy) & not_own)
+    weights = np.array([[MOBILITY_WEIGHTS[KNIGHT]], [-MOBILITY_WEIGHTS[KNIGHT]]])
+    score = (weights * counts).sum(axis=0)
+
+    # both colours' sliders and queens are stacked and slid together. Sliders on the same line
+    # can't share squares in one direction, the rear one stops at the front one
+    targets = np.concatenate((not_own, not_own))
+    for kind, directions in ((BISHOP, DIAGONAL_DIRECTIONS), (ROOK, ORTHOGONAL_DIRECTIONS)):
+        sliders = boards[:, [WHITE * kinds + kind, BLACK * kinds + kind,
+                             WHITE * kinds + QUEEN, BLACK * kinds + QUEEN]].T
+        counts = np.zeros(sliders.shape, dtype=np.uint16)
+        for direction in directions:
+            dx, dy = DIRECTIONS[direction]
+            counts += np.bitwise_count(slide(sliders, empty, dx, dy) & targets)
+        weights = np.array([[MOBILITY_WEIGHTS[kind]], [-MOBILITY_WEIGHTS[kind]],
+                            [MOBILITY_WEIGHTS[QUEEN]], [-MOBILITY_WEIGHTS[QUEEN]]])
+        score += (weights * counts).sum(axis=0)
+    return score
+
+
+def evaluate_bitboards(boards: np.ndarray,
+                       turns: np.ndarray = None) -> np.ndarray:
+    """
+    Scores every position in the batch with the tapered piece-square evaluation plus mobility
+    :param boards: (N, PLANES) uint64 bitboards
+    :param turns: the side to move colour indices, if given scores are from the side to move's
+                  point of view, otherwise from white's
+    :return: (N,) int32 scores in centipawns
+    """
+    count = len(boards)
+    # look up one byte of every position at a time, [plane * 8 + byte][position]
+    values = np.ascontiguousarray(boards.astype("<u8").view(np.uint8).reshape(count, PLANES * 8).T)
+    packed = BYTE_SCORES[0].take(values[0])
+    scores = np.empty_like(packed)
+    for row in range(1, PLANES * 8):
+        BYTE_SCORES[row].take(values[row], out=scores)
+        packed += scores
+    # unpack middlegame * 2 ** 32 + endgame, the endgame half is signed
+    endgame = ((packed + (1 << 31)) & 0xFFFFFFFF) - (1 << 31)
+    middlegame = (packed - endgame) >> 32
+    phase = np.minimum(popcount(boards) @ PHASE_PLANES, MAX_PHASE)
+
+    score = (middlegame * phase + endgame * (MAX_PHASE - phase)) // MAX_PHASE
+    score += mobility(boards)
+    if turns is not None:
+        score = np.where(turns == BLACK, -score, score)
+    return score.astype(np.int32)
+
+
+def evaluate_batch(planes: np.ndarray,
+                   turns: np.ndarray = None) -> np.ndarray:
+    """
+    Scores every position in the batch with the tapered piece-square evaluation plus mobility
+    :param planes: (N, PLANES, SIZE, SIZE) planes
+    :param turns: the side to move colour indices, if given scores are from the side to move's
+                  point of view, otherwise from white's
+    :return: (N,) int32 scores in centipawns
+    """
+    return evaluate_bitboards(bitboards_from_planes(planes), turns)
+
+
+def evaluate_position(chess: Chess) -> int:
+    """
+    Scores a single position with the same terms as evaluate_batch, one piece at a time
+    :param chess: the given position
+    :return: the score from the point of view of the side to move
+    """
+    phase = min(chess.phase, MAX_PHASE)
+    score = (chess.middlegame * phase + chess.endgame * (MAX_PHASE - phase)) // MAX_PHASE
+
+    board = chess.bitboard
+    for color, sign in ((WHITE, 1), (BLACK, -1)):
+        for kind in (KNIGHT, BISHOP, ROOK, QUEEN):
+            for sq in bits(board.pieces[color][kind]):
+                score += sign * MOBILITY_WEIGHTS[kind] * board.targets(sq, color, kind).bit_count()
+    return score if chess.turn == "white" else -score
@@ -0,0 +1,332 @@
+import numpy as np
+from engine.batch import PLANES, bitboards_from_planes, planes_from_bitboards, popcount, shift, slide
+from models.bitboard import KINDS, KING, QUEEN, BISHOP, KNIGHT, ROOK, PAWN, PROMOTION_ROWS, PROMOTIONS
+from models.chess import Chess
+from models.geometry import SIZE, SQUARES, FULL, DIRECTIONS, DIAGONAL_DIRECTIONS, ORTHOGONAL_DIRECTIONS, \
+    KNIGHT_STEPS, PAWN_DIRECTION, RAY_MASKS, KNIGHT_TARGETS, KING_TARGETS, PAWN_PUSHES, PAWN_CAPTURES, BETWEEN
+
+"""
+Vectorised legal move generation for batches of positions, the NumPy counterpart of Checker.
+A batch is given as planes and side to move colour indices like engine.batch, plus the
+castling rights masks and en passant squares that planes can't hold. Moves come back as
+(N, SQUARES) uint64 target bitboards indexed by the moving piece's square, which unpack to
+(N, SQUARES, SQUARES) [from][to] masks
+"""
+
+# index used for "no square", every table below has an empty entry there
+NO_SQUARE = SQUARES
+
+# positions generated at once, bounding the (chunk, SQUARES, directions) temporaries
+CHUNK = 4096
+
+
+def _table(values: [int]) -> np.ndarray:
+    """
+    Converts a list of bitboards to a uint64 array with an empty NO_SQUARE entry appended
+    :param values: the given bitboards
+    :return: np.ndarray
+    """
+    return np.array(list(values) + [0], dtype=np.uint64)
+
+
+RAY_TABLE = np.array([list(rays) for rays in RAY_MASKS] + [[0] * len(DIRECTIONS)], dtype=np.uint64)
+KNIGHT_TABLE = _table(KNIGHT_TARGETS)
+KING_TABLE = _table(KING_TARGETS)
+PAWN_CAPTURE_TABLE = np.array([list(PAWN_CAPTURES[color]) + [0] for color in range(2)], dtype=np.uint64)
+PAWN_PUSH_TABLE = np.array([[1 << pushes[0] if pushes else 0 for pushes in PAWN_PUSHES[color]] + [0]
+                            for color in range(2)], dtype=np.uint64)
+DOUBLE_PUSH_TABLE = np.array([[1 << pushes[1] if len(pushes) > 1 else 0 for pushes in PAWN_PUSHES[color]] + [0]
+                              for color in range(2)], dtype=np.uint64)
+BETWEEN_TABLE = np.array([list(row) + [0] for row in BETWEEN] + [[0] * (SQUARES + 1)], dtype=np.uint64)
+PROMOTION_TABLE = np.array(PROMOTION_ROWS, dtype=np.uint64)
+SQUARE_BITS = np.array([1 << sq for sq in range(SQUARES)], dtype=np.uint64)
+
+_FULL = np.uint64(FULL)
+_ONE = np.uint64(1)
+
+
+def lowest_bit(boards: np.ndarray) -> np.ndarray:
+    """
+    Isolates the lowest set bit of each bitboard, 0 stays 0
+    :param boards: uint64 bitboards
+    :return: np.ndarray
+    """
+    return boards & (~boards + _ONE)
+
+
+def highest_bit(boards: np.ndarray) -> np.ndarray:
+    """
+    Isolates the highest set bit of each bitboard, 0 stays 0
+    :param boards: uint64 bitboards
+    :return: np.ndarray
+    """
+    for amount in (1, 2, 4, 8, 16, 32):
+        boards = boards | (boards >> np.uint64(amount))
+    return boards ^ (boards >> _ONE)
+
+
+def square_of(boards: np.ndarray) -> np.ndarray:
+    """
+    Returns the square of the single bit set in each bitboard, NO_SQUARE where none is set
+    :param boards: uint64 bitboards holding at most one bit each
+    :return: np.ndarray
+    """
+    # a power of two converts to a float exactly, so its log is exact too
+    index = np.log2(np.maximum(boards, _ONE).astype(np.float64)).astype(np.intp)
+    return np.where(boards != 0, index, NO_SQUARE)
+
+
+def nearest(boards: np.ndarray,
+            direction: int) -> np.ndarray:
+    """
+    Isolates the bit closest to the start of a ray in the given direction, the first four
+    directions run towards higher squares
+    :param boards: uint64 bitboards of squares along a ray
+    :param direction: the index into DIRECTIONS
+    :return: np.ndarray
+    """
+    return lowest_bit(boards) if direction < 4 else highest_bit(boards)
+
+
+def ray_attacks(squares: np.ndarray,
+                occupied: np.ndarray,
+                directions: [int]) -> np.ndarray:
+    """
+    Vectorised bitboard.ray_attacks, looks up each ray and cuts it off beyond the first blocker
+    :param squares: the squares to slide from, NO_SQUARE gives no attacks
+    :param occupied: the blocking pieces, broadcast against squares
+    :param directions: the indices into DIRECTIONS to slide in
+    :return: np.ndarray
+    """
+    result = np.zeros(np.broadcast_shapes(np.shape(squares), np.shape(occupied)), dtype=np.uint64)
+    for direction in directions:
+        ray = RAY_TABLE[squares, direction]
+        blocker = nearest(ray & occupied, direction)
+        result |= ray ^ RAY_TABLE[square_of(blocker), direction]
+    return result
+
+
+def attacked_squares(pieces: np.ndarray,
+                     colors: np.ndarray,
+                     occupied: np.ndarray) -> np.ndarray:
+    """
+    Returns every square attacked by the given side, like Bitboard.attacks
+    :param pieces: (N, len(KINDS)) uint64 bitboards of the attacking side
+    :param colors: (N,) the attacking side's colour index
+    :param occupied: (N,) uint64 bitboards of the blocking pieces
+    :return: np.ndarray
+    """
+    empty = ~occupied
+    pawns = pieces[:, PAWN]
+    result = np.where(colors == 0,
+                      shift(pawns, -1, PAWN_DIRECTION[0]) | shift(pawns, 1, PAWN_DIRECTION[0]),
+                      shift(pawns, -1, PAWN_DIRECTION[1]) | shift(pawns, 1, PAWN_DIRECTION[1]))
+    for dx, dy in KNIGHT_STEPS:
+        result |= shift(pieces[:, KNIGHT], dx, dy)
+    for dx, dy in DIRECTIONS:
+        result |= shift(pieces[:, KING], dx, dy)
+
+    diagonal = pieces[:, BISHOP] | pieces[:, QUEEN]
+    orthogonal = pieces[:, ROOK] | pieces[:, QUEEN]
+    for direction, (dx, dy) in enumerate(DIRECTIONS):
+        sliders = diagonal if direction in DIAGONAL_DIRECTIONS else orthogonal
+        result |= slide(sliders, empty, dx, dy)
+    return result
+
+
+def attackers_of(squares: np.ndarray,
+                 pieces: np.ndarray,
+                 colors: np.ndarray,
+                 occupied: np.ndarray) -> np.ndarray:
+    """
+    Returns the pieces attacking each square, like Bitboard.attackers
+    :param squares: (N,) the given squares
+    :param pieces: (N, len(KINDS)) uint64 bitboards of the attacking side
+    :param colors: (N,) the attacking side's colour index
+    :param occupied: (N,) uint64 bitboards of the blocking pieces
+    :return: np.ndarray
+    """
+    return (PAWN_CAPTURE_TABLE[1 - colors, squares] & pieces[:, PAWN]) | \
+           (KNIGHT_TABLE[squares] & pieces[:, KNIGHT]) | \
+           (KING_TABLE[squares] & pieces[:, KING]) | \
+           (ray_attacks(squares, occupied, DIAGONAL_DIRECTIONS) & (pieces[:, BISHOP] | pieces[:, QUEEN])) | \
+           (ray_attacks(squares, occupied, ORTHOGONAL_DIRECTIONS) & (pieces[:, ROOK] | pieces[:, QUEEN]))
+
+
+def batch_from_chess(positions: [Chess]) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+    """
+    Packs the given positions into a batch
+    :param positions: the given positions
+    :return: (planes, turns, castling rights masks, en passant squares or -1)
+    """
+    states = [chess.state() for chess in positions]
+    boards = np.array([state[0] for state in states], dtype=np.uint64).reshape(-1, PLANES)
+    turns = np.array([state[1] for state in states], dtype=np.uint8)
+    castling = np.array([state[2] for state in states], dtype=np.uint8)
+    en_passant = np.array([state[3] for state in states], dtype=np.int8)
+    return planes_from_bitboards(boards), turns, castling, en_passant
+
+
+def generate_targets(boards: np.ndarray,
+                     turns: np.ndarray,
+                     castling: np.ndarray = None,
+                     en_passant: np.ndarray = None) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    Generates the moves of the side to move in every position of the batch
+    :param boards: (N, PLANES) uint64 bitboards
+    :param turns: (N,) the side to move colour indices
+    :param castling: (N,) castling rights masks, no castling if not given
+    :param en_passant: (N,) en passant squares or -1, none if not given
+    :return: (pseudo legal targets, legal targets, legal move counts). Targets are (N, SQUARES)
+             uint64 bitboards indexed by the moving piece's square. Pseudo legal targets match
+             Bitboard.targets, so leave castling out, and counts match len(Checker.legal_moves())
+    """
+    count = len(boards)
+    if castling is None:
+        castling = np.zeros(count, dtype=np.uint8)
+    if en_passant is None:
+        en_passant = np.full(count, -1, dtype=np.int8)
+
+    results = [_generate(boards[start:start + CHUNK],
+                         turns[start:start + CHUNK].astype(np.intp),
+                         castling[start:start + CHUNK].astype(np.intp),
+                         en_passant[start:start + CHUNK].astype(np.intp))
+               for start in range(0, count, CHUNK)]
+    if not results:
+        empty = np.zeros((0, SQUARES), dtype=np.uint64)
+        return empty, empty.copy(), np.zeros(0, dtype=np.int64)
+    return tuple(np.concatenate(parts) for parts in zip(*results))
+
+
+def generate_moves(planes: np.ndarray,
+                   turns: np.ndarray,
+                   castling: np.ndarray = None,
+                   en_passant: np.ndarray = None) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    Generates the moves of the side to move in every position of the batch as [from][to] masks
+    :param planes: (N, PLANES, SIZE, SIZE) planes
+    :param turns: (N,) the side to move colour indices
+    :param castling: (N,) castling rights masks, no castling if not given
+    :param en_passant: (N,) en passant squares or -1, none if not given
+    :return: (pseudo legal mask, legal mask, legal move counts), the masks are (N, SQUARES, SQUARES) bool
+    """
+    pseudo, legal, counts = generate_targets(bitboards_from_planes(planes), turns, castling, en_passant)
+    return masks_from_targets(pseudo), masks_from_targets(legal), counts
+
+
+def masks_from_targets(targets: np.ndarray) -> np.ndarray:
+    """
+    Unpacks (N, SQUARES) target bitboards into (N, SQUARES, SQUARES) [from][to] bool masks
+    :param targets: the given targets
+    :return: np.ndarray
+    """
+    count = len(targets)
+    unpacked = np.unpackbits(targets.astype("<u8").view(np.uint8).reshape(count, SQUARES, 8),
+                             axis=2, count=SQUARES, bitorder="little")
+    return unpacked.view(bool)
+
+
+def _generate(boards: np.ndarray,
+              turns: np.ndarray,
+              castling: np.ndarray,
+              en_passant: np.ndarray) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    generate_targets for a single chunk
+    :param boards: (N, PLANES) uint64 bitboards
+    :param turns: (N,) the side to move colour indices
+    :param castling: (N,) castling rights masks
+    :param en_passant: (N,) en passant squares or -1
+    :return: (pseudo legal targets, legal targets, legal move counts)
+    """
+    count = len(boards)
+    rows = np.arange(count)
+    sides = boards.reshape(count, 2, len(KINDS))
+    ours = sides[rows, turns]
+    theirs = sides[rows, 1 - turns]
+    own = np.bitwise_or.reduce(ours, axis=1)
+    enemy = np.bitwise_or.reduce(theirs, axis=1)
+    occupied = own | enemy
+    en_passant_bit = np.where(en_passant >= 0, np.uint64(1) << np.maximum(en_passant, 0).astype(np.uint64),
+                              np.uint64(0))
+
+    # pseudo legal targets from every square, then kept only where the matching piece stands
+    squares = np.arange(SQUARES)
+    on = [(ours[:, kind, None] & SQUARE_BITS) != 0 for kind in range(len(KINDS))]
+    diagonal = ray_attacks(squares, occupied[:, None], DIAGONAL_DIRECTIONS)
+    orthogonal = ray_attacks(squares, occupied[:, None], ORTHOGONAL_DIRECTIONS)
+
+    targets = np.zeros((count, SQUARES), dtype=np.uint64)
+    targets = np.where(on[KNIGHT], KNIGHT_TABLE[:SQUARES], targets)
+    targets = np.where(on[KING], KING_TABLE[:SQUARES], targets)
+    targets = np.where(on[BISHOP], diagonal, targets)
+    targets = np.where(on[ROOK], orthogonal, targets)
+    targets = np.where(on[QUEEN], diagonal | orthogonal, targets)
+    targets &= ~own[:, None]
+
+    empty = ~occupied[:, None]
+    single = PAWN_PUSH_TABLE[turns, :SQUARES] & empty
+    double = np.where(single != 0, DOUBLE_PUSH_TABLE[turns, :SQUARES] & empty, np.uint64(0))
+    captures = PAWN_CAPTURE_TABLE[turns, :SQUARES] & (enemy | en_passant_bit)[:, None]
+    pseudo = np.where(on[PAWN], single | double | captures, targets)
+
+    # checkers, and the squares other pieces may move to in reply: anything, a block or capture, or nothing
+    king_squares = square_of(ours[:, KING])
+    checkers = attackers_of(king_squares, theirs, 1 - turns, occupied)
+    checks = popcount(checkers)
+    evasions = np.where(checks == 0, _FULL,
+                        np.where(checks == 1, BETWEEN_TABLE[king_squares, square_of(lowest_bit(checkers))] | checkers,
+                                 np.uint64(0)))
+
+    # a piece pinned to its king may only move along the line between the king and the pinning piece
+    allowed = np.full((count, SQUARES + 1), _FULL, dtype=np.uint64)
+    for direction in range(len(DIRECTIONS)):
+        ray = RAY_TABLE[king_squares, direction]
+        first = nearest(ray & occupied, direction)
+        first_squares = square_of(first)
+        second = nearest(RAY_TABLE[first_squares, direction] & occupied, direction)
+        if direction in DIAGONAL_DIRECTIONS:
+            pinners = theirs[:, BISHOP] | theirs[:, QUEEN]
+        else:
+            pinners = theirs[:, ROOK] | theirs[:, QUEEN]
+        pinned = ((first & own) != 0) & ((second & pinners) != 0)
+        allowed[rows[pinned], first_squares[pinned]] = \
+            BETWEEN_TABLE[king_squares, square_of(second)][pinned] | second[pinned]
+
+    legal = pseudo & allowed[:, :SQUARES] & evasions[:, None]
+
+    # en passant is checked by playing it out, it can uncover a check along the row
+    pawns_from = on[PAWN] & ((captures & en_passant_bit[:, None]) != 0)
+    legal &= ~np.where(pawns_from, en_passant_bit[:, None], np.uint64(0))
+    for position, start in zip(*np.nonzero(pawns_from)):
+        start = int(start)
+        target = int(en_passant[position])
+        color = int(turns[position])
+        captured = target - PAWN_DIRECTION[color] * SIZE
+        after = int(occupied[position]) ^ (1 << start) ^ (1 << captured) ^ (1 << target)
+        pieces = theirs[position:position + 1].copy()
+        pieces[0, PAWN] ^= np.uint64(1 << captured)
+        attackers = attackers_of(king_squares[position:position + 1], pieces,
+                                 np.array([1 - color]), np.array([after], dtype=np.uint64))
+        if not attackers[0]:
+            legal[position, start] |= np.uint64(1 << target)
+
+    # the king may not move onto an attacked square, found with the king lifted so it can't hide behind itself
+    danger = attacked_squares(theirs, 1 - turns, occupied ^ ours[:, KING])
+    king_moves = pseudo[rows, king_squares] & ~danger
+
+    # castling, the first piece along the row must be our rook in its corner with the right still held
+    for direction, right in ((0, 1), (4, 2)):
+        ray = RAY_TABLE[king_squares, direction]
+        passing = lowest_bit(ray) if direction < 4 else highest_bit(ray)
+        landing = nearest(ray ^ passing, direction)
+        corner = highest_bit(ray) if direction < 4 else lowest_bit(ray)
+        castles = ((castling & (right << (2 * turns))) != 0) & (checks == 0) & \
+                  (nearest(ray & occupied, direction) == corner) & ((corner & ours[:, ROOK]) != 0) & \
+                  (landing != 0) & (((passing | landing) & danger) == 0)
+        king_moves |= np.where(castles, landing, np.uint64(0))
+    legal[rows, king_squares] = king_moves
+
+    # every promotion counts once per piece it can become
+    promotions = np.where(on[PAWN], legal & PROMOTION_TABLE[turns][:, None], np.uint64(0))
+    counts = popcount(legal).sum(axis=1) + (len(PROMOTIONS) - 1) * popcount(promotions).sum(axis=1)
+    return pseudo, legal, counts
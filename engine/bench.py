@@ -0,0 +1,253 @@
+import argparse
+import random
+import sys
+from engine.search import Search
+from engine.smp import ParallelSearch
+from engine.transposition import TranspositionTable
+from models.checker import Checker
+from models.chess import Chess
+from models.move import to_uci
+from models.move_cache import MoveCache
+from perft import POSITIONS, load
+from timer import Timer
+
+
+def run_bench(fen: str,
+              depth: int,
+              time_limit: float = None,
+              node_limit: int = None,
+              size_mb: float = 16,
+              cache_mb: float = 0) -> (int, float):
+    """
+    Searches the given position, printing the nodes, speed and time taken to reach each depth
+    :param fen: the position to search
+    :param depth: the deepest iteration to run
+    :param time_limit: the time budget in seconds, None for no limit
+    :param node_limit: the node budget, None for no limit
+    :param size_mb: the transposition table size in megabytes
+    :param cache_mb: the legal move cache size in megabytes, 0 for none
+    :return: (nodes, seconds)
+    """
+    cache = MoveCache(cache_mb) if cache_mb else None
+    chess, checker = load(fen, cache=cache)
+    search = Search(chess, checker, TranspositionTable(size_mb))
+    search.search(depth, time_limit, node_limit)
+
+    print(fen)
+    print("%5s %8s %10s %10s %10s  %s" % ("depth", "score", "nodes", "time (s)", "nodes/s", "pv"))
+    for current, score, nodes, seconds, pv in search.iterations:
+        print("%5d %8d %10d %10.4f %10d  %s" % (current, score, nodes, seconds,
+                                                nodes / max(seconds, 1e-9), " ".join(to_uci(move) for move in pv)))
+
+    seconds = search.timer.elapsed_time_s()
+    print("best move: %s, %d nodes in %.4fs" % (to_uci(search.best_move), search.nodes, seconds))
+    if cache:
+        print("move cache: %d hits, %d misses (%.0f%%), %d positions" %
+              (cache.hits, cache.misses, cache.hit_rate() * 100, len(cache)))
+    return search.nodes, seconds
+
+
+def run_speedup(fens: [str],
+                depth: int,
+                worker_counts: [int],
+                size_mb: float = 16) -> None:
+    """
+    Times a parallel search to the given depth with each number of workers, printing the
+    speedup over the first count
+    :param fens: the positions to search
+    :param depth: the depth to search to
+    :param worker_counts: the numbers of workers to compare
+    :param size_mb: the transposition table size in megabytes
+    :return: None
+    """
+    print("%7s %10s %12s %10s %8s" % ("workers", "time (s)", "nodes", "nodes/s", "speedup"))
+    baseline = None
+    for workers in worker_counts:
+        total_nodes = 0
+        total_seconds = 0
+        for fen in fens:
+            chess, checker = load(fen)
+            # a fresh pool and table for every position, started outside the timing
+            with ParallelSearch(workers, size_mb) as search:
+                timer = Timer()
+                timer.start_timer()
+                search.search(chess, depth)
+                timer.stop_timer()
+            total_nodes += search.nodes
+            total_seconds += timer.elapsed_time_s()
+
+        if baseline is None:
+            baseline = total_seconds
+        print("%7d %10.4f %12d %10d %8.2f" % (workers, total_seconds, total_nodes,
+                                              total_nodes / max(total_seconds, 1e-9),
+                                              baseline / max(total_seconds, 1e-9)))
+
+
+def sample_positions(count: int,
+                     seed: int = 0) -> [Chess]:
+    """
+    Plays random moves from the perft positions to build a varied set of positions
+    :param count: the number of positions to return
+    :param seed: the random seed
+    :return: [Chess]
+    """
+    rng = random.Random(seed)
+    fens = [fen for fen, expected in POSITIONS.values()]
+    positions = []
+    while len(positions) < count:
+        chess, checker = load(rng.choice(fens))
+        for ply in range(rng.randint(0, 40)):
+            checker.update()
+            moves = checker.legal_moves()
+            if not moves:
+                break
+            chess.make_move(rng.choice(moves))
+        positions.append(chess)
+    return positions
+
+
+def run_batch(count: int,
+              distinct: int = 1000) -> bool:
+    """
+    Times evaluate_batch against evaluating the same positions one at a time
+    :param count: the number of positions to evaluate
+    :param distinct: how many different positions to repeat to make up the count
+    :return: bool (if every batch score matched)
+    """
+    # imported here so the rest of the benchmarks don't need numpy
+    from engine.batch import evaluate_batch, evaluate_position, planes_from_chess
+
+    sample = sample_positions(min(count, distinct))
+    positions = [sample[idx % len(sample)] for idx in range(count)]
+    timer = Timer()
+
+    timer.start_timer()
+    expected = [evaluate_position(chess) for chess in positions]
+    timer.stop_timer()
+    loop_seconds = timer.elapsed_time_s()
+
+    timer.start_timer()
+    planes, turns = planes_from_chess(positions)
+    timer.stop_timer()
+    pack_seconds = timer.elapsed_time_s()
+
+    timer.start_timer()
+    scores = evaluate_batch(planes, turns)
+    timer.stop_timer()
+    batch_seconds = timer.elapsed_time_s()
+
+    print("%d positions" % count)
+    print("%-20s %10.4fs %12d positions/s" % ("one at a time", loop_seconds, count / max(loop_seconds, 1e-9)))
+    print("%-20s %10.4fs %12d positions/s" % ("packing planes", pack_seconds, count / max(pack_seconds, 1e-9)))
+    print("%-20s %10.4fs %12d positions/s" % ("evaluate_batch", batch_seconds, count / max(batch_seconds, 1e-9)))
+    print("speedup: %.1fx evaluating, %.1fx including packing" %
+          (loop_seconds / max(batch_seconds, 1e-9), loop_seconds / max(batch_seconds + pack_seconds, 1e-9)))
+    matched = list(scores) == expected
+    if not matched:
+        print("batch scores did not match the one at a time scores")
+    return matched
+
+
+def run_movegen(count: int) -> bool:
+    """
+    Times generate_targets against Checker on random positions and checks they agree move for move
+    :param count: the number of positions to generate moves for
+    :return: bool (if every position matched)
+    """
+    # imported here so the rest of the benchmarks don't need numpy
+    import numpy as np
+    from engine.batch_moves import batch_from_chess, generate_targets
+    from engine.batch import bitboards_from_planes
+    from models.move import move_from, move_to
+
+    positions = sample_positions(count)
+    planes, turns, castling, en_passant = batch_from_chess(positions)
+    boards = bitboards_from_planes(planes)
+    timer = Timer()
+
+    timer.start_timer()
+    pseudo, legal, counts = generate_targets(boards, turns, castling, en_passant)
+    timer.stop_timer()
+    batch_seconds = timer.elapsed_time_s()
+
+    timer.start_timer()
+    expected = []
+    for chess in positions:
+        checker = Checker(chess)
+        checker.update()
+        expected.append(checker.legal_moves())
+    timer.stop_timer()
+    loop_seconds = timer.elapsed_time_s()
+
+    mismatches = 0
+    for idx, moves in enumerate(expected):
+        targets = {}
+        for move in moves:
+            targets[move_from(move)] = targets.get(move_from(move), 0) | (1 << move_to(move))
+        found = {sq: int(legal[idx, sq]) for sq in np.flatnonzero(legal[idx])}
+        if found != targets or counts[idx] != len(moves):
+            mismatches += 1
+
+    print("%d positions" % count)
+    print("%-20s %10.4fs %12d positions/s" % ("Checker", loop_seconds, count / max(loop_seconds, 1e-9)))
+    print("%-20s %10.4fs %12d positions/s" % ("generate_targets", batch_seconds, count / max(batch_seconds, 1e-9)))
+    print("speedup: %.1fx, %d positions differ from Checker" % (loop_seconds / max(batch_seconds, 1e-9), mismatches))
+    return mismatches == 0
+
+
+def main() -> int:
+    """
+    Command line entry point
+    :return: int (the exit code)
+    """
+    parser = argparse.ArgumentParser(description="Times the search on fixed positions")
+    parser.add_argument("depth", type=int, help="the deepest iteration to run")
+    parser.add_argument("--fen", help="a FEN to search, overrides --position")
+    parser.add_argument("--position", choices=sorted(POSITIONS),
+                        help="a standard position, all of them when neither this nor --fen are given")
+    parser.add_argument("--time", type=float, help="time budget per position in seconds")
+    parser.add_argument("--nodes", type=int, help="node budget per position")
+    parser.add_argument("--hash", type=float, default=16, help="transposition table size in megabytes")
+    parser.add_argument("--move-cache", type=float, default=0,
+                        help="legal move cache size in megabytes, none if 0")
+    parser.add_argument("--workers", type=int, nargs="*",
+                        help="time a parallel search to the given depth with each number of workers "
+                             "instead, 1 2 4 8 16 if no numbers are given")
+    parser.add_argument("--batch", type=int, metavar="N",
+                        help="time evaluating N positions with evaluate_batch instead, depth is ignored")
+    parser.add_argument("--movegen", type=int, metavar="N",
+                        help="time batch move generation on N random positions and check it against Checker "
+                             "instead, depth is ignored")
+    args = parser.parse_args()
+
+    if args.movegen:
+        return 0 if run_movegen(args.movegen) else 1
+    if args.batch:
+        return 0 if run_batch(args.batch) else 1
+
+    if args.fen:
+        fens = [args.fen]
+    elif args.position:
+        fens = [POSITIONS[args.position][0]]
+    else:
+        fens = [fen for fen, expected in POSITIONS.values()]
+
+    if args.workers is not None:
+        run_speedup(fens, args.depth, args.workers or [1, 2, 4, 8, 16], args.hash)
+        return 0
+
+    total_nodes = 0
+    total_seconds = 0
+    for fen in fens:
+        nodes, seconds = run_bench(fen, args.depth, args.time, args.nodes, args.hash, args.move_cache)
+        total_nodes += nodes
+        total_seconds += seconds
+        print()
+
+    print("total: %d nodes in %.4fs, %d nodes/s" % (total_nodes, total_seconds,
+                                                   total_nodes / max(total_seconds, 1e-9)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
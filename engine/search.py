@@ -0,0 +1,388 @@
+from engine.see import see
+from engine.transposition import TranspositionTable, EXACT, LOWER, UPPER
+from models.bitboard import KIND_IDX, PAWN, QUEEN
+from models.checker import Checker
+from models.chess import Chess
+from models.evaluation import MATE, PIECE_VALUES, evaluate
+from models.geometry import coords
+from models.move import CAPTURE, move_from, move_to, move_promotion
+from timer import Timer
+
+# the deepest iteration and the longest line the search will follow
+MAX_DEPTH = 64
+MAX_PLY = 128
+
+INFINITY = MATE + 1
+# scores past this are mates, stored in the table relative to the node rather than the root
+MATE_BOUND = MATE - MAX_PLY
+
+# captures that leave the score this far below alpha, even after winning the piece, aren't searched
+DELTA_MARGIN = 200
+
+# how often, in nodes, the time and node budget is checked
+CHECK_INTERVAL = 1024
+
+# move ordering bands, the table move first, then captures and promotions, then killers
+TABLE_MOVE_ORDER = 1 << 24
+CAPTURE_ORDER = 1 << 20
+KILLER_ORDER = 1 << 16
+
+
+class SearchStopped(Exception):
+    """
+    Raised inside the search when the time or node budget runs out
+    """
+    pass
+
+
+def score_to_table(score: int,
+                   ply: int) -> int:
+    """
+    Converts a mate score from distance to the root to distance from the node before storing it
+    :param score: the given score
+    :param ply: the node's distance from the root
+    :return: int
+    """
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_table(score: int,
+                     ply: int) -> int:
+    """
+    Reverses score_to_table for a node at the given ply
+    :param score: the stored score
+    :param ply: the node's distance from the root
+    :return: int
+    """
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class Search:
+    """
+    Negamax alpha-beta search with iterative deepening and a transposition table
+    """
+
+    def __init__(self,
+                 chess: Chess,
+                 checker: Checker = None,
+                 table: TranspositionTable = None):
+        """
+        Constructs the search over the given position, which is searched in place
+        :param chess: the position to search
+        :param checker: the checker attached to the position, a new one is created if not given
+        :param table: the transposition table to use, a new one is created if not given
+        """
+        self.chess = chess
+        self.checker = checker if checker else Checker(chess)
+        self.table = table if table else TranspositionTable()
+        self.timer = Timer()
+        self.time_limit = None                              # seconds the search may run for
+        self.node_limit = None                              # nodes the search may visit
+        self.stop_flag = None                               # optional shared [int], the search stops once it is set
+        self.nodes = 0                                      # nodes visited by the current search
+        self.best_move = 0                                  # best packed move of the last full iteration
+        self.score = 0                                      # score of the last full iteration
+        self.depth = 0                                      # depth of the last full iteration
+        self.pv = []                                        # principal variation of the last full iteration
+        self.iterations = []                                # [(depth, score, nodes, seconds, pv)]
+        self.pv_table = [[] for ply in range(MAX_PLY + 1)]  # principal variation found below each ply
+        self.killers = [[0, 0] for ply in range(MAX_PLY + 1)]
+
+    def search(self,
+               max_depth: int = MAX_DEPTH,
+               time_limit: float = None,
+               node_limit: int = None,
+               start_depth: int = 1) -> int:
+        """
+        Searches one ply deeper each iteration until the depth, time or node budget runs out
+        :param max_depth: the deepest iteration to run
+        :param time_limit: the time budget in seconds, None for no limit
+        :param node_limit: the node budget, None for no limit
+        :param start_depth: the first iteration to run
+        :return: the best packed move, 0 if the side to move has none
+        """
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.best_move = 0
+        self.score = 0
+        self.depth = 0
+        self.pv = []
+        self.iterations = []
+        self.killers = [[0, 0] for ply in range(MAX_PLY + 1)]
+        self.table.new_search()
+
+        root = len(self.chess.undo_stack)
+        self.timer.start_timer()
+        try:
+            for depth in range(min(start_depth, max_depth), max_depth + 1):
+                score = self.negamax(depth, -INFINITY, INFINITY, 0)
+                self.__complete_iteration(depth, score)
+
+                # stop once a mate is found or the next iteration has little chance of finishing
+                if abs(score) >= MATE_BOUND or not self.pv:
+                    break
+                if self.time_limit and self.timer.peek_s() > self.time_limit / 2:
+                    break
+        except SearchStopped:
+            # unwind the moves that were being searched when the budget ran out
+            while len(self.chess.undo_stack) > root:
+                self.chess.unmake_move()
+        self.timer.stop_timer()
+
+        # leave the checker describing the root position again
+        self.checker.update()
+        if not self.best_move and self.checker.legal_moves():
+            self.best_move = self.checker.legal_moves()[0]
+        return self.best_move
+
+    def __complete_iteration(self,
+                             depth: int,
+                             score: int) -> None:
+        """
+        Records the result of a finished iteration
+        :param depth: the depth searched
+        :param score: the root score
+        :return: None
+        """
+        self.pv = list(self.pv_table[0])
+        self.best_move = self.pv[0] if self.pv else 0
+        self.score = score
+        self.depth = depth
+        self.iterations.append((depth, score, self.nodes, self.timer.peek_s(), self.pv))
+
+    def __check_budget(self) -> None:
+        """
+        Stops the search if it has used up its time or nodes, or another search asked it to stop
+        :return: None
+        """
+        if (self.node_limit and self.nodes >= self.node_limit) or \
+           (self.time_limit and self.timer.peek_s() >= self.time_limit) or \
+           (self.stop_flag is not None and self.stop_flag[0]):
+            raise SearchStopped()
+
+    def negamax(self,
+                depth: int,
+                alpha: int,
+                beta: int,
+                ply: int) -> int:
+        """
+        Alpha-beta search of the current position
+        :param depth: the remaining depth
+        :param alpha: the score the side to move is already guaranteed
+        :param beta: the score the opponent is already guaranteed
+        :param ply: the distance from the root
+        :return: the score from the point of view of the side to move
+        """
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0 and self.depth > 0:
+            self.__check_budget()
+
+        chess = self.chess
+        key = chess.hash
+        self.pv_table[ply] = []
+
+        # a repeat of any earlier position in the line is scored as the draw it can be forced into
+        if ply > 0 and (chess.is_repetition(2) or chess.is_fifty_moves() or chess.is_insufficient_material()):
+            return 0
+
+        # use a stored result if it was searched deep enough, otherwise just its move
+        table_move = 0
+        entry = self.table.probe(key)
+        if entry:
+            table_move, table_score, table_depth, bound = entry
+            if ply > 0 and table_depth >= depth:
+                table_score = score_from_table(table_score, ply)
+                if bound == EXACT or \
+                   (bound == LOWER and table_score >= beta) or \
+                   (bound == UPPER and table_score <= alpha):
+                    return table_score
+
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiesce(alpha, beta, ply)
+
+        self.checker.update()
+        moves = self.checker.legal_moves()
+        if not moves:
+            return -MATE + ply if self.checker.in_check() else 0
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        for move in self.order_moves(moves, table_move, ply):
+            chess.make_move(move)
+            score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            chess.unmake_move()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                    if alpha >= beta:
+                        self.__store_killer(move, ply)
+                        break
+
+        if best_score >= beta:
+            bound = LOWER
+        elif best_score > original_alpha:
+            bound = EXACT
+        else:
+            bound = UPPER
+        self.table.store(key, best_move, score_to_table(best_score, ply), depth, bound)
+        return best_score
+
+    def quiesce(self,
+                alpha: int,
+                beta: int,
+                ply: int) -> int:
+        """
+        Searches captures and queen promotions only until the position is quiet, so the
+        evaluation is never taken halfway through an exchange. The side to move may stand
+        pat on the static evaluation instead of capturing, and captures that lose material
+        by static exchange evaluation are pruned. In check there is no standing pat, every
+        evasion is searched so mates at the horizon are seen
+        :param alpha: the score the side to move is already guaranteed
+        :param beta: the score the opponent is already guaranteed
+        :param ply: the distance from the root
+        :return: the score from the point of view of the side to move
+        """
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0 and self.depth > 0:
+            self.__check_budget()
+
+        chess = self.chess
+        if ply >= MAX_PLY:
+            return evaluate(chess)
+
+        self.checker.update()
+        if self.checker.in_check():
+            return self.__quiesce_evasions(alpha, beta, ply)
+
+        stand_pat = evaluate(chess)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        board = chess.board
+        best_score = stand_pat
+        for move in self.order_moves(self.checker.legal_moves(), 0, ply):
+            promotion = move_promotion(move)
+            if not move & CAPTURE and promotion != QUEEN:
+                # moves are ordered captures and promotions first, so the rest are all quiet
+                if not promotion:
+                    break
+                continue
+
+            # skip captures that can't lift the score to alpha even if the piece is won for free
+            x, y = coords(move_to(move))
+            victim = board[y][x]
+            gain = PIECE_VALUES[KIND_IDX[victim.key]] if victim else PIECE_VALUES[PAWN]
+            if not promotion and stand_pat + gain + DELTA_MARGIN <= alpha:
+                continue
+            # skip captures that lose material once the exchange is played out
+            if not promotion and see(chess, move) < 0:
+                continue
+
+            chess.make_move(move)
+            score = -self.quiesce(-beta, -alpha, ply + 1)
+            chess.unmake_move()
+
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def __quiesce_evasions(self,
+                           alpha: int,
+                           beta: int,
+                           ply: int) -> int:
+        """
+        Searches every legal reply to a check from quiescence, the checker must be up to date
+        :param alpha: the score the side to move is already guaranteed
+        :param beta: the score the opponent is already guaranteed
+        :param ply: the distance from the root
+        :return: the score from the point of view of the side to move
+        """
+        moves = self.checker.legal_moves()
+        if not moves:
+            return -MATE + ply
+
+        chess = self.chess
+        best_score = -INFINITY
+        for move in self.order_moves(moves, 0, ply):
+            chess.make_move(move)
+            score = -self.quiesce(-beta, -alpha, ply + 1)
+            chess.unmake_move()
+
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def order_moves(self,
+                    moves: [int],
+                    table_move: int,
+                    ply: int) -> [int]:
+        """
+        Sorts moves so the ones most likely to cause a cutoff are searched first
+        :param moves: the given packed moves
+        :param table_move: the move stored in the transposition table, 0 for none
+        :param ply: the distance from the root
+        :return: [int]
+        """
+        board = self.chess.board
+        killers = self.killers[ply]
+
+        def order(move: int) -> int:
+            if move == table_move:
+                return TABLE_MOVE_ORDER
+            promotion = move_promotion(move)
+            if move & CAPTURE or promotion:
+                # most valuable victim first, then least valuable attacker
+                x, y = coords(move_to(move))
+                victim = board[y][x]
+                x, y = coords(move_from(move))
+                attacker = board[y][x]
+                victim_value = PIECE_VALUES[KIND_IDX[victim.key]] if victim else PIECE_VALUES[PAWN]
+                if not move & CAPTURE:
+                    victim_value = 0
+                return CAPTURE_ORDER + victim_value * 16 + PIECE_VALUES[promotion] - \
+                    PIECE_VALUES[KIND_IDX[attacker.key]] // 100
+            if move == killers[0] or move == killers[1]:
+                return KILLER_ORDER
+            return 0
+
+        return sorted(moves, key=order, reverse=True)
+
+    def __store_killer(self,
+                       move: int,
+                       ply: int) -> None:
+        """
+        Remembers a quiet move that caused a cutoff so it is tried early in sibling nodes
+        :param move: the given packed move
+        :param ply: the distance from the root
+        :return: None
+        """
+        if move & CAPTURE or move_promotion(move):
+            return
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
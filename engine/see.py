@@ -0,0 +1,67 @@
+from models.bitboard import BISHOP, KING, KNIGHT, PAWN, QUEEN, ROOK, COLOR_IDX, KIND_IDX
+from models.chess import Chess
+from models.evaluation import PIECE_VALUES
+from models.geometry import PAWN_DIRECTION, coords, square
+from models.move import EN_PASSANT, move_from, move_promotion, move_to
+
+# exchange values, the king is worth more than everything else so it is never given up
+SEE_VALUES = PIECE_VALUES[:KING] + [20000] + PIECE_VALUES[KING + 1:]
+
+# the order attackers join an exchange, cheapest first
+CAPTURE_ORDER = [PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING]
+
+
+def see(chess: Chess,
+        move: int) -> int:
+    """
+    Static exchange evaluation. Plays out every capture on the target square, cheapest attacker
+    first, with either side free to stop when carrying on would lose material. Pins are ignored
+    :param chess: the given position
+    :param move: the given packed move
+    :return: the material won by the side making the move, in centipawns
+    """
+    board = chess.bitboard
+    start, target = move_from(move), move_to(move)
+    x, y = coords(start)
+    mover = chess.board[y][x]
+    color = COLOR_IDX[mover.color]
+    occupied = board.all ^ (1 << start)
+
+    # the value on the target square, which an en passant capture takes from behind it
+    if move & EN_PASSANT:
+        x, y = coords(target)
+        occupied ^= 1 << square(x, y - PAWN_DIRECTION[color])
+        gains = [SEE_VALUES[PAWN]]
+    else:
+        x, y = coords(target)
+        victim = chess.board[y][x]
+        gains = [SEE_VALUES[KIND_IDX[victim.key]] if victim else 0]
+
+    # the value of the piece now standing on the target square
+    promotion = move_promotion(move)
+    if promotion:
+        gains[0] += SEE_VALUES[promotion] - SEE_VALUES[PAWN]
+        on_target = SEE_VALUES[promotion]
+    else:
+        on_target = SEE_VALUES[KIND_IDX[mover.key]]
+
+    # each side in turn takes back with its cheapest attacker, sliders behind it join as it leaves
+    side = color ^ 1
+    while True:
+        attackers = board.attackers(target, side, occupied)
+        if not attackers:
+            break
+        for kind in CAPTURE_ORDER:
+            candidates = attackers & board.pieces[side][kind]
+            if candidates:
+                break
+        gains.append(on_target - gains[-1])
+        on_target = SEE_VALUES[kind]
+        occupied ^= candidates & -candidates
+        side ^= 1
+
+    # work backwards, each side only makes its capture if it doesn't lose out
+    while len(gains) > 1:
+        last = gains.pop()
+        gains[-1] = -max(-gains[-1], last)
+    return gains[0]
@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+from engine.search import MAX_DEPTH, Search
+from engine.transposition import BUCKET_BYTES, TranspositionTable, buckets_for_size
+from factory import Factory
+from models.checker import Checker
+from models.chess import Chess
+
+"""
+The shared memory block starts with a single word that is set once any worker finishes
+its search, telling the others to stop, followed by the transposition table
+"""
+STOP_BYTES = 8
+
+# per worker process: the attached shared memory, its stop flag and table, filled in by _attach
+_worker = {}
+
+
+def _attach(name: str) -> None:
+    """
+    Pool initializer, attaches the worker process to the shared table
+    :param name: the name of the shared memory block
+    :return: None
+    """
+    memory = shared_memory.SharedMemory(name=name)
+    _worker["memory"] = memory
+    _worker["stop"] = memory.buf[:STOP_BYTES].cast("Q")
+    _worker["table"] = TranspositionTable(buffer=memory.buf[STOP_BYTES:])
+
+
+def _search_worker(task: tuple) -> (int, int, int, int, [int]):
+    """
+    Searches the root position in a worker process
+    :param task: (state, worker index, max depth, time limit, node limit, table generation)
+    :return: (best move, score, depth, nodes, pv)
+    """
+    state, index, max_depth, time_limit, node_limit, generation = task
+    chess = Chess()
+    chess.load_state(Factory(), state)
+
+    table = _worker["table"]
+    # the search ages the table by one, so every worker ends up on the same generation
+    table.generation = generation
+    search = Search(chess, Checker(chess), table)
+    search.stop_flag = _worker["stop"]
+
+    # every other worker starts a ply deeper so the workers spread over different depths
+    search.search(max_depth, time_limit, node_limit, start_depth=1 + index % 2)
+    _worker["stop"][0] = 1
+    return search.best_move, search.score, search.depth, search.nodes, search.pv
+
+
+class ParallelSearch:
+    """
+    Lazy SMP search. Every worker process searches the same root position and they share
+    a transposition table in shared memory, so each benefits from what the others store
+    """
+
+    def __init__(self,
+                 workers: int = None,
+                 size_mb: float = 16):
+        """
+        Starts the worker processes and allocates the shared table
+        :param workers: the number of worker processes, one per core if not given
+        :param size_mb: the transposition table size in megabytes
+        """
+        self.workers = workers if workers else os.cpu_count()
+        self.memory = shared_memory.SharedMemory(create=True,
+                                                 size=STOP_BYTES + buckets_for_size(size_mb) * BUCKET_BYTES)
+        self.stop = self.memory.buf[:STOP_BYTES].cast("Q")
+        self.pool = multiprocessing.Pool(self.workers, initializer=_attach, initargs=(self.memory.name,))
+        self.generation = 0             # table generation, aged once per search
+        self.best_move = 0              # best packed move of the last search
+        self.score = 0                  # score of the last search
+        self.depth = 0                  # deepest iteration completed by any worker
+        self.nodes = 0                  # nodes visited by every worker together
+        self.pv = []                    # principal variation of the chosen worker
+
+    def search(self,
+               chess: Chess,
+               max_depth: int = MAX_DEPTH,
+               time_limit: float = None,
+               node_limit: int = None) -> int:
+        """
+        Searches the given position on every worker, stopping them all when the first one finishes
+        :param chess: the position to search, left unchanged
+        :param max_depth: the deepest iteration to run
+        :param time_limit: the time budget in seconds, None for no limit
+        :param node_limit: the node budget for each worker, None for no limit
+        :return: the best packed move, 0 if the side to move has none
+        """
+        self.stop[0] = 0
+        self.generation = (self.generation + 1) & 0xFF
+        state = chess.state()
+        tasks = [(state, index, max_depth, time_limit, node_limit, (self.generation - 1) & 0xFF)
+                 for index in range(self.workers)]
+        results = self.pool.map(_search_worker, tasks, chunksize=1)
+
+        # take the deepest result, preferring the first worker when depths tie
+        self.best_move, self.score, self.depth, nodes, self.pv = max(results, key=lambda result: result[2])
+        self.nodes = sum(result[3] for result in results)
+        return self.best_move
+
+    def close(self) -> None:
+        """
+        Stops the worker processes and frees the shared table
+        :return: None
+        """
+        self.pool.close()
+        self.pool.join()
+        self.stop.release()
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
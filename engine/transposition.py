@@ -0,0 +1,146 @@
+from array import array
+from models.move import FLAG_SHIFT
+
+# bound types stored with a score, 0 marks an empty slot
+EXACT = 1
+LOWER = 2
+UPPER = 3
+
+"""
+Each entry is two unsigned 64 bit words, [key ^ data, data]. Storing the key XORed
+with the data lets a reader spot an entry torn by a concurrent writer, as the key
+check then fails. The data word is laid out from the lowest bit as
+[packed move][score + SCORE_OFFSET][depth, 8 bits][bound, 2 bits][generation, 8 bits]
+"""
+MOVE_BITS = FLAG_SHIFT + 4
+SCORE_BITS = 22
+SCORE_OFFSET = 1 << (SCORE_BITS - 1)
+SCORE_SHIFT = MOVE_BITS
+DEPTH_SHIFT = SCORE_SHIFT + SCORE_BITS
+BOUND_SHIFT = DEPTH_SHIFT + 8
+GENERATION_SHIFT = BOUND_SHIFT + 2
+
+MOVE_MASK = (1 << MOVE_BITS) - 1
+SCORE_MASK = (1 << SCORE_BITS) - 1
+
+# words per entry and entries per bucket
+ENTRY_WORDS = 2
+BUCKET_ENTRIES = 2
+BUCKET_WORDS = ENTRY_WORDS * BUCKET_ENTRIES
+BUCKET_BYTES = BUCKET_WORDS * 8
+
+
+def buckets_for_size(size_mb: float) -> int:
+    """
+    Returns the largest power of two number of buckets that fits in the given size
+    :param size_mb: the table size in megabytes
+    :return: int
+    """
+    buckets = max(1, int(size_mb * 1024 * 1024) // BUCKET_BYTES)
+    return 1 << (buckets.bit_length() - 1)
+
+
+class TranspositionTable:
+    """
+    Fixed size hash table of search results keyed by Chess.hash. Each bucket holds a
+    depth preferred entry, only replaced by a deeper search or one from a newer
+    generation, and an entry that is always replaced
+    """
+
+    def __init__(self,
+                 size_mb: float = 16,
+                 buffer=None):
+        """
+        Allocates the table
+        :param size_mb: the table size in megabytes, ignored when a buffer is given
+        :param buffer: optional writable buffer (eg. shared memory) to store the table in
+        """
+        if buffer is not None:
+            self.table = memoryview(buffer).cast("Q")
+            buckets = len(self.table) // BUCKET_WORDS
+            self.buckets = 1 << (buckets.bit_length() - 1)
+        else:
+            self.buckets = buckets_for_size(size_mb)
+            self.table = array("Q", bytes(self.buckets * BUCKET_BYTES))
+        self.mask = self.buckets - 1
+        self.generation = 0
+
+    def release(self) -> None:
+        """
+        Releases the view of a shared buffer so the buffer can be closed
+        :return: None
+        """
+        if isinstance(self.table, memoryview):
+            self.table.release()
+
+    def new_search(self) -> None:
+        """
+        Ages the table so entries from earlier searches are replaced first
+        :return: None
+        """
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self) -> None:
+        """
+        Empties every entry
+        :return: None
+        """
+        for idx in range(len(self.table)):
+            self.table[idx] = 0
+
+    def probe(self,
+              key: int) -> (int, int, int, int):
+        """
+        Looks up the given position
+        :param key: the position's zobrist key
+        :return: (move, score, depth, bound), or None if the position isn't stored
+        """
+        table = self.table
+        idx = (key & self.mask) * BUCKET_WORDS
+        for slot in range(idx, idx + BUCKET_WORDS, ENTRY_WORDS):
+            data = table[slot + 1]
+            if table[slot] ^ data == key and data:
+                return (data & MOVE_MASK,
+                        ((data >> SCORE_SHIFT) & SCORE_MASK) - SCORE_OFFSET,
+                        (data >> DEPTH_SHIFT) & 0xFF,
+                        (data >> BOUND_SHIFT) & 3)
+        return None
+
+    def store(self,
+              key: int,
+              move: int,
+              score: int,
+              depth: int,
+              bound: int) -> None:
+        """
+        Stores a search result, choosing which entry in the bucket to replace
+        :param key: the position's zobrist key
+        :param move: the best packed move found, 0 for none
+        :param score: the score found
+        :param depth: the depth searched
+        :param bound: EXACT, LOWER or UPPER
+        :return: None
+        """
+        table = self.table
+        idx = (key & self.mask) * BUCKET_WORDS
+
+        # keep the deeper result unless the stored one is stale or for the same position
+        preferred = table[idx + 1]
+        if table[idx] ^ preferred == key or \
+           (preferred >> GENERATION_SHIFT) != self.generation or \
+           depth >= (preferred >> DEPTH_SHIFT) & 0xFF:
+            slot = idx
+        else:
+            slot = idx + ENTRY_WORDS
+
+        # don't lose the best move when a search of the same position found none
+        if not move and table[slot] ^ table[slot + 1] == key:
+            move = table[slot + 1] & MOVE_MASK
+
+        data = move | \
+            ((score + SCORE_OFFSET) << SCORE_SHIFT) | \
+            (min(depth, 0xFF) << DEPTH_SHIFT) | \
+            (bound << BOUND_SHIFT) | \
+            (self.generation << GENERATION_SHIFT)
+        table[slot] = key ^ data
+        table[slot + 1] = data
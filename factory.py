@@ -1,4 +1,3 @@
-import pygame
 from configs import configs
 from models.piece import Piece
 
@@ -8,7 +7,7 @@ BLACK_IDX = 1
 
 """
 Piece construction values
-(index into the img array, piece key, white FEN, black FEN)
+(index into the sprite sheet row, piece key, white FEN, black FEN)
 """
 PIECE_INFO = [
     (0, "king", "K", "k"),
@@ -19,19 +18,26 @@ PIECE_INFO = [
     (5, "pawn", "P", "p")
 ]
 
+# piece key -> index into a row of the sprite sheet
+IMAGE_IDX = {record[1]: record[0] for record in PIECE_INFO}
+
+# FEN letter -> (piece key, color)
+FEN_PIECES = {**{record[2]: (record[1], "white") for record in PIECE_INFO},
+              **{record[3]: (record[1], "black") for record in PIECE_INFO}}
+
+# (piece key, color) -> FEN letter
+FEN_LETTERS = {piece: letter for letter, piece in FEN_PIECES.items()}
+
 
 class Factory:
 
-    def __init__(self,
-                 images: []):
+    def __init__(self):
         self.id = 0
-        self.images = images
 
     def create_board(self,
                      fe_notation: str) -> [[Piece]]:
         """
         Generates a 2D array of pieces from the given FEN string
-        :param images: the list of piece pngs
         :param fe_notation: the given FEN string
         :return:
         """
@@ -42,34 +48,21 @@ class Factory:
 
         # iterate our FEN character by character
         for char in fe_notation:
-            # reset our next piece
-            n_piece = None
-
-            # move to next line if we hit the \
+            # move to next line if we hit the /
             if char == "/":
                 y += 1
                 x = 0
-                continue
 
             # increment the x pointer if the character is numeric
-            elif char.isnumeric():
+            elif char.isdigit():
                 x += int(char)
-                continue
-
-            # handle the creation of any pieces
-            for record in PIECE_INFO:
-                if record[2] == char:
-                    n_piece = Piece(self.id, record[1], self.images["white"][record[0]], "white", False)
-                    self.id += 1
-                    break
-                elif record[3] == char:
-                    n_piece = Piece(self.id, record[1], self.images["black"][record[0]], "black", False)
-                    self.id += 1
-                    break
 
             # set our piece at the given coordinate and increment our x
-            pieces[y][x] = n_piece
-            x += 1
+            else:
+                if char not in FEN_PIECES:
+                    raise ValueError("invalid piece %r in FEN %r" % (char, fe_notation))
+                pieces[y][x] = self.create_piece(*FEN_PIECES[char])
+                x += 1
 
         # return the generated board
         return pieces
@@ -83,48 +76,48 @@ class Factory:
         :return: [Piece]
         """
         return [
-            Piece(self.id, "queen", self.images[color][1], color, False),
-            Piece(self.id, "bishop", self.images[color][2], color, False),
-            Piece(self.id, "knight", self.images[color][3], color, False),
-            Piece(self.id, "rook", self.images[color][4], color, False)
+            self.create_piece("queen", color),
+            self.create_piece("bishop", color),
+            self.create_piece("knight", color),
+            self.create_piece("rook", color)
         ]
 
+    def create_piece(self,
+                     key: str,
+                     color: str) -> Piece:
+        """
+        Creates a single piece with the next unique id
+        :param key: the piece's key
+        :param color: the given color
+        :return: Piece
+        """
+        piece = Piece(self.id, key, color, False)
+        self.id += 1
+        return piece
+
     @staticmethod
     def to_fen_string(board: [[Piece]]) -> str:
         """
-        Returns a fen string from the given board state
+        Returns the piece placement field of a FEN for the given board state
         :param board: the given board
         :return: a formatted fen
         """
-        fen = ""
+        rows = []
 
-        # iterate the board, count will be used to keep track of how many empty tiles we iterate per row
-        for y in range(len(board)):
+        # count keeps track of how many empty tiles we pass before the next piece
+        for row in board:
+            fields = []
             count = 0
-            for x in range(len(board[0])):
-                # get our piece and check if its not null
-                piece = board[y][x]
+            for piece in row:
                 if piece:
-                    # check if we have iterated empty cells and write the value
                     if count > 0:
-                        fen += str(count)
+                        fields.append(str(count))
                         count = 0
-                    # write the character determined by the piece
-                    for record in PIECE_INFO:
-                        if record[1] == piece.key:
-                            if piece.color == "white":
-                                fen += record[2]
-                            else:
-                                fen += record[3]
+                    fields.append(FEN_LETTERS[(piece.key, piece.color)])
                 else:
                     count += 1
-            # check count once more before iterating to the next row
             if count > 0:
-                fen += str(count)
-            # write the new row char only if we aren't on the final iteration
-            if y < len(board) - 1:
-                fen += '/'
-
-        print(fen)
-        return fen
+                fields.append(str(count))
+            rows.append("".join(fields))
 
+        return "/".join(rows)
@@ -3,13 +3,18 @@ import utils
 from configs import configs
 from models.selector import Selector
 from render import Render
-from models.checker import Checker
+from models.checker import CHECKMATE, Checker
 from models.chess import Chess
+from models.move_cache import MoveCache
 from factory import Factory
+from engine.search import Search
+from engine.transposition import TranspositionTable
+from models.san import last_move_san
 
 
 STATE_RUNNING = "running"
 STATE_PROMOTION = "promotion"
+STATE_OVER = "over"
 
 
 class Game:
@@ -20,7 +25,6 @@ class Game:
         Initalised all the game variables
         :param screen:
         """
-        self.images = None              # split up our pieces tile map
         self.running = True             # loop variable
         self.state = STATE_RUNNING      # game state variable
         self.factory = None             # factory object
@@ -29,15 +33,21 @@ class Game:
         self.current_moves = []
         self.screen = screen            # pointer to the screen object
         self.selector = None            # selector variable
+        self.engine = None              # search playing the colors in configs["engine_colors"]
+        self.notation = []              # SAN of every move played, written once as each move is finished
+        self.result = None              # how the game ended, None while it is still going
+        self.clock = pygame.time.Clock()  # keeps the loop to configs["frame_rate"] so an idle game idles
 
         # initialise all the objects
-        self.render = Render(self.screen, self.chess)
-        self.images = utils.split_image("pieces.png")
-        self.factory = Factory(self.images)
+        self.render = Render(self.screen, self.chess, self.notation)
+        self.factory = Factory()
         self.chess.load_board(self.factory)
-        self.checker = Checker(self.chess)
+        cache = MoveCache(configs["move_cache_size"]) if configs["move_cache_size"] else None
+        self.checker = Checker(self.chess, cache=cache)
         self.checker.update()
         self.current_moves = self.checker.moves_for_team()
+        if configs["engine_colors"]:
+            self.engine = Search(self.chess, self.checker, TranspositionTable(configs["engine_hash_size"]))
 
     @staticmethod
     def mouse_pos() -> (int, int):
@@ -73,8 +83,13 @@ class Game:
         if point and self.checker.can_move(self.chess.picked_up, (point[0], point[1])):
             # put the piece down and update if successful
             if self.chess.put_down(point[0], point[1]):
+                # a promotion is written down once the piece has been chosen
+                if not self.chess.pawn_promotion:
+                    self.notation.append(last_move_san(self.chess))
                 self.checker.update()
                 self.current_moves = self.checker.moves_for_team()
+                if not self.chess.pawn_promotion:
+                    self.check_game_over()
         # return the piece if we have clicked an invalid location
         else:
             self.chess.return_piece()
@@ -99,6 +114,19 @@ class Game:
         else:
             self.current_moves = self.checker.moves_for_team()
 
+    def on_engine_turn(self) -> None:
+        """
+        Lets the engine search for and play a move for the side to move
+        :return: None
+        """
+        move = self.engine.search(time_limit=configs["engine_time"])
+        if move:
+            self.chess.make_move(move)
+            self.notation.append(last_move_san(self.chess))
+            self.checker.update()
+            self.current_moves = self.checker.moves_for_team()
+            self.check_game_over()
+
     def handle_state_running_input(self) -> None:
         """
         Handles input for the running state
@@ -109,6 +137,9 @@ class Game:
             # on quit, set the loop condition variable to false
             if event.type == pygame.QUIT:
                 self.running = False
+            # the window was uncovered, so nothing on screen can be trusted
+            if event.type == pygame.VIDEOEXPOSE:
+                self.render.invalidate()
 
             # check mouse down input
             if event.type == pygame.MOUSEBUTTONDOWN:
@@ -128,7 +159,7 @@ class Game:
                 if event.key == pygame.K_d:
                     configs["show_last_move"] = not configs["show_last_move"]
                 if event.key == pygame.K_f:
-                    print(self.factory.to_fen_string(self.chess.board))
+                    print(self.chess.to_fen())
 
     def handle_state_promotion_input(self) -> None:
         """
@@ -139,6 +170,9 @@ class Game:
             # on quit, set the loop condition variable to false
             if event.type == pygame.QUIT:
                 self.running = False
+            # the window was uncovered, so nothing on screen can be trusted
+            if event.type == pygame.VIDEOEXPOSE:
+                self.render.invalidate()
             if event.type == pygame.KEYUP:
                 # toggle show piece moves
                 if event.key == pygame.K_LEFT:
@@ -152,8 +186,40 @@ class Game:
                     self.chess.replace_with_new_piece(
                         self.selector.get_selected_piece(),
                         move.end_coords)
+                    self.notation.append(last_move_san(self.chess))
                     self.checker.update()
                     self.state = STATE_RUNNING
+                    self.check_game_over()
+
+    def handle_state_over_input(self) -> None:
+        """
+        Handles input once the game has ended
+        :return: None
+        """
+        for event in pygame.event.get():
+            # on quit, set the loop condition variable to false
+            if event.type == pygame.QUIT:
+                self.running = False
+            # the window was uncovered, so nothing on screen can be trusted
+            if event.type == pygame.VIDEOEXPOSE:
+                self.render.invalidate()
+            if event.type == pygame.KEYUP and event.key == pygame.K_f:
+                print(self.chess.to_fen())
+
+    def check_game_over(self) -> None:
+        """
+        Ends the game if the last move finished it
+        :return: None
+        """
+        ending = self.checker.termination()
+        if not ending:
+            return
+        if ending == CHECKMATE:
+            self.result = "%s wins by %s" % (utils.invert_team_color(self.chess.turn).title(), ending)
+        else:
+            self.result = "Draw by %s" % ending
+        self.current_moves = []
+        self.state = STATE_OVER
 
     def run(self):
         while self.running:
@@ -165,6 +231,12 @@ class Game:
                     self.state = STATE_PROMOTION
                     continue
 
+                # let the engine move if it plays the side to move
+                if self.engine and self.chess.turn in configs["engine_colors"] and not self.chess.picked_up:
+                    self.on_engine_turn()
+                    if self.state == STATE_OVER:
+                        continue
+
                 # handle input
                 self.handle_state_running_input()
 
@@ -174,9 +246,13 @@ class Game:
 
                 # render the screen
                 self.render.render(current_moves=self.current_moves)
+            elif self.state == STATE_OVER:
+                self.handle_state_over_input()
+                self.render.render(result=self.result)
             else:
                 self.handle_state_promotion_input()
                 self.render.render(selector=self.selector)
+            self.clock.tick(configs["frame_rate"])
 
 
 
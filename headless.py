@@ -0,0 +1,253 @@
+import argparse
+import random
+import sys
+from engine.search import Search
+from engine.transposition import TranspositionTable
+from factory import Factory
+from models.bitboard import KIND_IDX
+from models.checker import CHECKMATE, Checker
+from models.chess import Chess, DEFAULT_START
+from models.move import Move, move_from, move_promotion, move_to, pack, to_uci
+from models.move_cache import MoveCache
+from models.geometry import square
+from pgn import san_moves
+from timer import Timer
+
+"""
+Runs games without a display. Nothing here (or imported from here) loads pygame, so many
+games can be played from batch jobs on machines without one.
+
+A player is any callable taking (chess, checker) and returning the move to play, either a
+packed move or a Move. The checker is up to date with the position when the player is called
+"""
+
+# game results
+WHITE_WINS = "1-0"
+BLACK_WINS = "0-1"
+DRAW = "1/2-1/2"
+UNFINISHED = "*"
+
+
+def always_queen(chess: Chess) -> str:
+    """
+    Default promotion chooser, picks the piece a pawn reaching the back row becomes
+    :param chess: the position with the pawn on the back row
+    :return: str (the piece key)
+    """
+    return "queen"
+
+
+class RandomPlayer:
+    """
+    Plays a uniformly random legal move
+    """
+
+    def __init__(self,
+                 seed: int = None):
+        """
+        :param seed: the random seed, for repeatable games
+        """
+        self.random = random.Random(seed)
+
+    def __call__(self,
+                 chess: Chess,
+                 checker: Checker) -> int:
+        return self.random.choice(checker.legal_moves())
+
+
+class EnginePlayer:
+    """
+    Plays the move found by the alpha-beta search
+    """
+
+    def __init__(self,
+                 time_limit: float = None,
+                 max_depth: int = None,
+                 node_limit: int = None,
+                 size_mb: float = 16):
+        """
+        :param time_limit: seconds to think for each move
+        :param max_depth: the deepest iteration to search each move
+        :param node_limit: nodes to search each move
+        :param size_mb: the transposition table size in megabytes
+        """
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.node_limit = node_limit
+        self.table = TranspositionTable(size_mb)
+        self.search = None              # created for the first position the player is given
+
+    def __call__(self,
+                 chess: Chess,
+                 checker: Checker) -> int:
+        if not self.search or self.search.chess is not chess:
+            self.search = Search(chess, checker, self.table)
+        if self.max_depth:
+            return self.search.search(self.max_depth, self.time_limit, self.node_limit)
+        return self.search.search(time_limit=self.time_limit, node_limit=self.node_limit)
+
+
+class HeadlessGame:
+    """
+    Plays a game between two players with the same rules as Game
+    """
+
+    def __init__(self,
+                 white,
+                 black,
+                 fen: str = DEFAULT_START,
+                 max_plies: int = 500,
+                 promotion=always_queen,
+                 cache: MoveCache = None):
+        """
+        Sets up the position and players
+        :param white: the player for white
+        :param black: the player for black
+        :param fen: the starting position
+        :param max_plies: the game is left unfinished after this many moves
+        :param promotion: callable taking the chess object and returning the key of the piece a
+                          pawn becomes, used when a player's move doesn't say
+        :param cache: optional legal move cache, it may be shared by games played one after another
+        """
+        self.players = {"white": white, "black": black}
+        self.max_plies = max_plies
+        self.promotion = promotion
+        self.factory = Factory()
+        self.chess = Chess()
+        self.chess.load_board(self.factory, fen)
+        self.checker = Checker(self.chess, cache=cache)
+        self.checker.update()
+        self.moves = []                 # packed moves played, in order
+        self.result = UNFINISHED        # one of WHITE_WINS, BLACK_WINS, DRAW or UNFINISHED
+        self.reason = ""                # why the game ended
+        self.ending = self.checker.termination()  # how the position ends the game, None while it goes on
+
+    def legal_move(self,
+                   move) -> int:
+        """
+        Finds the legal packed move matching the one a player returned. Flags may be left off,
+        and a promotion with no piece chosen is given one by the promotion chooser
+        :param move: the given packed move or Move
+        :return: int
+        """
+        if isinstance(move, Move):
+            (sx, sy), (ex, ey) = move.start_coords, move.end_coords
+            start, end = square(sx, sy), square(ex, ey)
+            promotion = KIND_IDX[move.promotion] if move.promotion else 0
+        else:
+            start, end, promotion = move_from(move), move_to(move), move_promotion(move)
+
+        candidates = [legal for legal in self.checker.legal_moves()
+                      if move_from(legal) == start and move_to(legal) == end]
+        if candidates and not promotion and move_promotion(candidates[0]):
+            promotion = KIND_IDX[self.promotion(self.chess)]
+        for legal in candidates:
+            if move_promotion(legal) == promotion:
+                return legal
+        raise ValueError("illegal move %s for %s" % (to_uci(move if isinstance(move, int) else pack(start, end)),
+                                                     self.chess.turn))
+
+    def step(self) -> bool:
+        """
+        Asks the side to move for a move and plays it
+        :return: bool (if the game is still going)
+        """
+        if self.is_over():
+            return False
+
+        move = self.legal_move(self.players[self.chess.turn](self.chess, self.checker))
+        self.chess.make_move(move)
+        self.checker.update()
+        self.ending = self.checker.termination()
+        self.moves.append(move)
+        return not self.is_over()
+
+    def is_over(self) -> bool:
+        """
+        Checks for the end of the game, setting the result and reason when it has ended. The
+        position's termination is worked out once per move by step
+        :return: bool
+        """
+        if self.result != UNFINISHED:
+            return True
+        ending = self.ending
+        if ending:
+            if ending == CHECKMATE:
+                self.result = BLACK_WINS if self.chess.turn == "white" else WHITE_WINS
+            else:
+                self.result = DRAW
+            self.reason = ending
+            return True
+        if len(self.moves) >= self.max_plies:
+            self.reason = "move limit"
+            return True
+        return False
+
+    def play(self) -> str:
+        """
+        Plays the game out
+        :return: str (the result)
+        """
+        while self.step():
+            pass
+        return self.result
+
+
+def make_player(kind: str,
+                args: argparse.Namespace,
+                seed: int):
+    """
+    Builds a player from its command line name
+    :param kind: engine or random
+    :param args: the parsed command line
+    :param seed: the random seed for random players
+    :return: the player
+    """
+    if kind == "random":
+        return RandomPlayer(seed)
+    return EnginePlayer(args.time, args.depth, args.nodes)
+
+
+def main() -> int:
+    """
+    Command line entry point, plays a match between two players
+    :return: int (the exit code)
+    """
+    parser = argparse.ArgumentParser(description="Plays games without a display")
+    parser.add_argument("--white", choices=["engine", "random"], default="engine", help="the white player")
+    parser.add_argument("--black", choices=["engine", "random"], default="engine", help="the black player")
+    parser.add_argument("--games", type=int, default=1, help="the number of games to play")
+    parser.add_argument("--fen", default=DEFAULT_START, help="the starting position")
+    parser.add_argument("--time", type=float, default=0.1, help="engine seconds per move")
+    parser.add_argument("--depth", type=int, help="engine depth per move")
+    parser.add_argument("--nodes", type=int, help="engine nodes per move")
+    parser.add_argument("--max-plies", type=int, default=500, help="moves before a game is left unfinished")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random players")
+    parser.add_argument("--move-cache", type=float, default=8,
+                        help="legal move cache size in megabytes, shared by every game, none if 0")
+    args = parser.parse_args()
+
+    cache = MoveCache(args.move_cache) if args.move_cache else None
+
+    results = {WHITE_WINS: 0, BLACK_WINS: 0, DRAW: 0, UNFINISHED: 0}
+    timer = Timer()
+    timer.start_timer()
+    for idx in range(args.games):
+        game = HeadlessGame(make_player(args.white, args, args.seed + idx * 2),
+                            make_player(args.black, args, args.seed + idx * 2 + 1),
+                            args.fen, args.max_plies, cache=cache)
+        result = game.play()
+        results[result] += 1
+        print("game %d: %s (%s) in %d plies: %s" % (idx + 1, result, game.reason, len(game.moves),
+                                                   " ".join(san_moves(args.fen, game.moves))))
+    timer.stop_timer()
+
+    print("\nwhite wins: %d, black wins: %d, draws: %d, unfinished: %d in %.2fs" %
+          (results[WHITE_WINS], results[BLACK_WINS], results[DRAW], results[UNFINISHED], timer.elapsed_time_s()))
+    if cache:
+        print("move cache: %d hits, %d misses (%.0f%%)" % (cache.hits, cache.misses, cache.hit_rate() * 100))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
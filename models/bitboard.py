@@ -0,0 +1,319 @@
+from configs import configs
+from models.geometry import SIZE, FULL, PAWN_DIRECTION, DIAGONAL_DIRECTIONS, ORTHOGONAL_DIRECTIONS, \
+    RAY_MASKS, KNIGHT_TARGETS, KING_TARGETS, PAWN_PUSHES, PAWN_CAPTURES, BETWEEN, square, coords
+
+# colour and piece indices into Bitboard.pieces
+WHITE = 0
+BLACK = 1
+COLORS = configs["player_tags"]
+KINDS = ["king", "queen", "bishop", "knight", "rook", "pawn"]
+KING, QUEEN, BISHOP, KNIGHT, ROOK, PAWN = range(len(KINDS))
+COLOR_IDX = {color: idx for idx, color in enumerate(COLORS)}
+KIND_IDX = {kind: idx for idx, kind in enumerate(KINDS)}
+
+# the kinds a pawn may promote to, strongest first
+PROMOTIONS = [QUEEN, ROOK, BISHOP, KNIGHT]
+
+# one mask per column and row of the board
+FILES = [sum(1 << (y * SIZE + x) for y in range(SIZE)) for x in range(SIZE)]
+ROWS = [((1 << SIZE) - 1) << (y * SIZE) for y in range(SIZE)]
+
+# the row each colour's pawns promote on
+PROMOTION_ROWS = [ROWS[0], ROWS[SIZE - 1]]
+
+# the light squares, a8 is light
+LIGHT_SQUARES = sum(1 << (y * SIZE + x) for y in range(SIZE) for x in range(SIZE) if (x + y) % 2 == 0)
+
+"""
+Masks applied after shifting a bitboard dx columns, removing the bits that
+wrapped around onto the opposite edge of the board
+"""
+WRAP = {0: FULL}
+for _dx in range(1, SIZE):
+    WRAP[_dx] = FULL & ~sum(FILES[:_dx])
+    WRAP[-_dx] = FULL & ~sum(FILES[SIZE - _dx:])
+
+
+def bits(bb: int):
+    """
+    Yields the index of every set bit in the given bitboard, lowest first
+    :param bb: the given bitboard
+    :return: generator of int
+    """
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def lowest(bb: int) -> int:
+    """
+    Returns the index of the lowest set bit in the given bitboard
+    :param bb: the given (non empty) bitboard
+    :return: int
+    """
+    return (bb & -bb).bit_length() - 1
+
+
+def shift(bb: int,
+          dx: int,
+          dy: int) -> int:
+    """
+    Moves every bit in the bitboard dx columns and dy rows, dropping any that leave the board
+    :param bb: the given bitboard
+    :param dx: the column offset
+    :param dy: the row offset
+    :return: int
+    """
+    amount = dy * SIZE + dx
+    if amount > 0:
+        bb = (bb << amount) & FULL
+    else:
+        bb >>= -amount
+    return bb & WRAP[dx]
+
+
+def pawn_attacks(bb: int,
+                 color: int) -> int:
+    """
+    Returns every square attacked diagonally by the given pawns
+    :param bb: the given pawns
+    :param color: the pawns colour index
+    :return: int
+    """
+    dy = PAWN_DIRECTION[color]
+    return shift(bb, -1, dy) | shift(bb, 1, dy)
+
+
+def ray_attacks(sq: int,
+                directions: [int],
+                occupied: int) -> int:
+    """
+    Returns the squares a slider on the given square reaches along the given directions,
+    up to and including the first occupied square on each ray
+    :param sq: the slider's square
+    :param directions: indices into geometry.DIRECTIONS
+    :param occupied: bitboard of occupied squares
+    :return: int
+    """
+    result = 0
+    masks = RAY_MASKS[sq]
+    for direction in directions:
+        ray = masks[direction]
+        blockers = ray & occupied
+        if blockers:
+            # the nearest blocker is the lowest bit on increasing rays and the highest on decreasing ones
+            if direction < 4:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= RAY_MASKS[blocker][direction]
+        result |= ray
+    return result
+
+
+class Bitboard:
+    """
+    Position stored as one bitboard per piece kind and colour plus occupancy
+    """
+
+    def __init__(self):
+        """
+        Constructs an empty position
+        """
+        self.pieces = [[0 for kind in KINDS] for color in COLORS]   # [color][kind] bitboards
+        self.occupied = [0 for color in COLORS]                     # all pieces per colour
+        self.all = 0                                                # all pieces on the board
+
+    def copy(self) -> 'Bitboard':
+        """
+        Returns an independent copy of the position
+        :return: Bitboard
+        """
+        result = Bitboard.__new__(Bitboard)
+        result.pieces = [list(kinds) for kinds in self.pieces]
+        result.occupied = list(self.occupied)
+        result.all = self.all
+        return result
+
+    def add(self,
+            sq: int,
+            color: int,
+            kind: int) -> None:
+        """
+        Places a piece on the given square
+        :param sq: the given square
+        :param color: the piece's colour index
+        :param kind: the piece's kind index
+        :return: None
+        """
+        bit = 1 << sq
+        self.pieces[color][kind] |= bit
+        self.occupied[color] |= bit
+        self.all |= bit
+
+    def remove(self,
+               sq: int,
+               color: int,
+               kind: int) -> None:
+        """
+        Removes a piece from the given square
+        :param sq: the given square
+        :param color: the piece's colour index
+        :param kind: the piece's kind index
+        :return: None
+        """
+        bit = ~(1 << sq)
+        self.pieces[color][kind] &= bit
+        self.occupied[color] &= bit
+        self.all &= bit
+
+    def king_square(self,
+                    color: int) -> int:
+        """
+        Returns the square of the given colour's king
+        :param color: the given colour index
+        :return: int
+        """
+        return lowest(self.pieces[color][KING])
+
+    def targets(self,
+                sq: int,
+                color: int,
+                kind: int,
+                en_passant: int = 0) -> int:
+        """
+        Returns the pseudo legal target squares of the piece on the given square, castling excluded
+        :param sq: the piece's square
+        :param color: the piece's colour index
+        :param kind: the piece's kind index
+        :param en_passant: bitboard holding the en passant target square, if any
+        :return: int
+        """
+        occupied = self.all
+
+        if kind == PAWN:
+            result = PAWN_CAPTURES[color][sq] & (self.occupied[color ^ 1] | en_passant)
+            for target in PAWN_PUSHES[color][sq]:
+                if occupied >> target & 1:
+                    break
+                result |= 1 << target
+            return result
+        elif kind == KNIGHT:
+            result = KNIGHT_TARGETS[sq]
+        elif kind == BISHOP:
+            result = ray_attacks(sq, DIAGONAL_DIRECTIONS, occupied)
+        elif kind == ROOK:
+            result = ray_attacks(sq, ORTHOGONAL_DIRECTIONS, occupied)
+        elif kind == QUEEN:
+            result = ray_attacks(sq, range(8), occupied)
+        else:
+            result = KING_TARGETS[sq]
+
+        return result & ~self.occupied[color]
+
+    def attacks(self,
+                color: int,
+                ignore: int = 0) -> int:
+        """
+        Returns every square attacked by the given colour
+        :param color: the given colour index
+        :param ignore: bitboard of pieces the sliding attacks should pass through
+        :return: int
+        """
+        pieces = self.pieces[color]
+        occupied = self.all & ~ignore
+        result = pawn_attacks(pieces[PAWN], color)
+
+        for sq in bits(pieces[KNIGHT]):
+            result |= KNIGHT_TARGETS[sq]
+        for sq in bits(pieces[KING]):
+            result |= KING_TARGETS[sq]
+        for sq in bits(pieces[BISHOP] | pieces[QUEEN]):
+            result |= ray_attacks(sq, DIAGONAL_DIRECTIONS, occupied)
+        for sq in bits(pieces[ROOK] | pieces[QUEEN]):
+            result |= ray_attacks(sq, ORTHOGONAL_DIRECTIONS, occupied)
+        return result
+
+    def attackers(self,
+                  sq: int,
+                  color: int,
+                  occupied: int = None) -> int:
+        """
+        Returns every piece of the given colour attacking the given square
+        :param sq: the given square
+        :param color: the attacking colour index
+        :param occupied: the squares that block sliding pieces, every piece if not given. Pieces
+                         missing from it are treated as gone, so sliders behind them are found too
+        :return: int
+        """
+        if occupied is None:
+            occupied = self.all
+        pieces = self.pieces[color]
+        queens = pieces[QUEEN]
+        # look outwards from the square with each piece's movement and see if we land on one
+        return ((PAWN_CAPTURES[color ^ 1][sq] & pieces[PAWN]) |
+                (KNIGHT_TARGETS[sq] & pieces[KNIGHT]) |
+                (KING_TARGETS[sq] & pieces[KING]) |
+                (ray_attacks(sq, DIAGONAL_DIRECTIONS, occupied) & (pieces[BISHOP] | queens)) |
+                (ray_attacks(sq, ORTHOGONAL_DIRECTIONS, occupied) & (pieces[ROOK] | queens))) & occupied
+
+    def is_attacked(self,
+                    sq: int,
+                    color: int) -> bool:
+        """
+        Checks if the given square is attacked by the given colour
+        :param sq: the given square
+        :param color: the attacking colour index
+        :return: bool
+        """
+        return self.attackers(sq, color) != 0
+
+    def pins(self,
+             sq: int,
+             color: int) -> {int: int}:
+        """
+        Finds every piece of the given colour absolutely pinned to the given (king) square
+        :param sq: the king's square
+        :param color: the king's colour index
+        :return: {pinned square: bitboard of squares it may still move to}
+        """
+        result = {}
+        enemy = self.pieces[color ^ 1]
+        own = self.occupied[color]
+        occupied = self.all
+        masks = RAY_MASKS[sq]
+
+        for directions, sliders in ((DIAGONAL_DIRECTIONS, enemy[BISHOP] | enemy[QUEEN]),
+                                    (ORTHOGONAL_DIRECTIONS, enemy[ROOK] | enemy[QUEEN])):
+            if not sliders:
+                continue
+            for direction in directions:
+                blockers = masks[direction] & occupied
+                if not blockers:
+                    continue
+
+                # the nearest piece along the ray is pinned if it is ours and an enemy slider is next behind it
+                if direction < 4:
+                    first = lowest(blockers)
+                    blockers ^= 1 << first
+                    second = lowest(blockers) if blockers else -1
+                else:
+                    first = blockers.bit_length() - 1
+                    blockers ^= 1 << first
+                    second = blockers.bit_length() - 1
+
+                if second >= 0 and own >> first & 1 and sliders >> second & 1:
+                    result[first] = BETWEEN[sq][second] | (1 << second)
+        return result
+
+    @staticmethod
+    def between(start: int,
+                end: int) -> int:
+        """
+        Returns the squares strictly between two squares sharing a row, column or diagonal
+        :param start: the given start square
+        :param end: the given end square
+        :return: int
+        """
+        return BETWEEN[start][end]
@@ -1,21 +1,53 @@
-import utils
-import copy
-from configs import configs
+from array import array
+from models.bitboard import BISHOP, BLACK, COLOR_IDX, FULL, KIND_IDX, KING, KNIGHT, PAWN, PAWN_DIRECTION, \
+    PROMOTION_ROWS, PROMOTIONS, QUEEN, ROOK, SIZE, WHITE, bits, coords, lowest, ray_attacks, square
+from models.geometry import DIAGONAL_DIRECTIONS, KING_TARGETS, KNIGHT_TARGETS, ORTHOGONAL_DIRECTIONS, PAWN_CAPTURES, \
+    PAWN_PUSH_MASKS, RAYS
 from models.chess import Chess
+from models.move import CAPTURE, CASTLE, DOUBLE_PUSH, EN_PASSANT, TO_SHIFT, pack
+from models.move_cache import MoveCache
 from models.piece import Piece
 
+# the ways a game ends, returned by Checker.termination
+CHECKMATE = "checkmate"
+STALEMATE = "stalemate"
+REPETITION = "threefold repetition"
+FIFTY_MOVES = "fifty-move rule"
+INSUFFICIENT_MATERIAL = "insufficient material"
+
+# the directions each sliding kind moves in
+SLIDER_DIRECTIONS = {BISHOP: DIAGONAL_DIRECTIONS, ROOK: ORTHOGONAL_DIRECTIONS, QUEEN: range(8)}
+
 
 class Checker:
 
     def __init__(self,
-                 chess: Chess):
+                 chess: Chess,
+                 incremental: bool = True,
+                 cache: MoveCache = None):
         """
         Initalises the move checking object with the game object
         :param chess: pointer to the current chess object
+        :param incremental: only rescan the pieces the last change to the board can affect, when
+                            False every piece is scanned again on each update
+        :param cache: optional cache to look positions up in before working their moves out
         """
         self.__chess = chess
-        # stored as [(piece.id, (x, y)]
+        self.__incremental = incremental
+        self.__cache = cache
+        # stored as [colour]{square: (pseudo legal targets, attacked squares, squares its targets depend on)}
+        self.__pieces = [{}, {}]
+        # stored as [colour]{square: (legal targets, the ones holding an enemy, the en passant one, [packed move])},
+        # reused while all three stay the same as the flags depend on nothing else
+        self.__packed = [{}, {}]
+        # the piece bitboards and en passant square the stored pieces were scanned with
+        self.__snapshot = None
+        # stored as [packed move] for the side to move
         self.__current_moves = []
+        # stored as {piece.id: bitboard of target squares}
+        self.__current_targets = {}
+        # bitboard of the pieces giving check to the side to move
+        self.__checkers = 0
 
     def moves_for_team(self) -> (str, [(int, int)]):
         """
@@ -24,21 +56,18 @@ class Checker:
         :return: (str, [(int, int)])
         """
         result = []
-        for move in self.__current_moves:
-            result.extend(move[1])
+        for targets in self.__current_targets.values():
+            result.extend(coords(target) for target in bits(targets))
         return "team", result
 
     def moves_for_id(self,
                      piece_id: int) -> (str, [(int, int)]):
         """
-        Searches the list of piece moves to find the matching ID
+        Returns the moves stored for the given piece id
         :param piece_id: the given piece id
         :return: (str, [(int, int)])
         """
-        for move in self.__current_moves:
-            if piece_id == move[0]:
-                return "piece", move[1]
-        return "piece", []
+        return "piece", [coords(target) for target in bits(self.__current_targets.get(piece_id, 0))]
 
     def moves_for_piece(self,
                         piece: Piece) -> (str, [(int, int)]):
@@ -59,335 +88,378 @@ class Checker:
         :param coord: the given coordinate
         :return: bool
         """
-        return coord in self.moves_for_piece(piece)[1]
+        return bool(self.__current_targets.get(piece.id, 0) >> square(coord[0], coord[1]) & 1)
 
-    def update(self) -> None:
+    def in_check(self) -> bool:
         """
-        Updates all lists of available moves
-        :return: None
+        Returns if the side to move was in check at the last update
+        :return: bool
         """
-        self.__current_moves = []
+        return self.__checkers != 0
 
-        for piece in self.__chess.pieces_for_color(self.__chess.turn):
-            temp_moves = []
-            moves = self.__check_moves_for_piece(piece)
-
-            for coord in moves:
-                if not self.__check_moves_into_check(piece, coord):
-                    temp_moves.append(coord)
-
-            if len(temp_moves) > 0:
-                self.__current_moves.append((piece.id, temp_moves))
-
-    def __recalculate_for_color(self,
-                                color) -> [(int, int)]:
+    def legal_moves(self) -> [int]:
         """
-        Returns a new list with all the given colors moves.
-        :param color: the given color
-        :return: [(int, int)]
+        Returns every legal move for the side to move as packed ints, one per promotion choice
+        :return: [int]
         """
-        result = []
-        for piece in self.__chess.pieces_for_color(color):
-            result.extend(self.__check_moves_for_piece(piece))
-        return result
+        return self.__current_moves
 
-    def __check_moves_into_check(self,
-                                 piece: Piece,
-                                 to_coord: [int, int]):
+    def has_any_legal_move(self) -> bool:
         """
-        Checks if the given move will trigger check
-        :param piece: the given piece
-        :param to_coord: the given coord
-        :return: true if in check, false if not
-        """
-        # place the piece for testing
-        temp_piece = self.__chess.piece_at(to_coord)
-        from_coord = self.__chess.piece_idx(piece)
-        self.__chess.set_piece(piece, to_coord)
-        self.__chess.set_piece(None, from_coord)
-
-        # recalculate moves for the opponent color
-        opponents_color = utils.invert_team_color(piece.color)
-        new_moves = self.__recalculate_for_color(opponents_color)
-
-        # check if the king occupies a potential move
-        king = self.__chess.get_king(piece.color)
-        coords = self.__chess.piece_idx(king)
-        result = coords in new_moves
-
-        # remove the piece we placed
-        self.__chess.set_piece(temp_piece, to_coord)
-        self.__chess.set_piece(piece, from_coord)
-        return result
-
-    def __check_moves_for_piece(self,
-                                piece: Piece) -> [(int, int)]:
-        """
-        Checks all possible moves for a given piece
-        :param piece: the given piece
-        :return: [(x, y)]
-        """
-        # check the type of each piece and call the appropriate function
-        if piece.key == "bishop":
-            return self.__bishop(piece)
-        elif piece.key == "rook":
-            return self.__rook(piece)
-        elif piece.key == "knight":
-            return self.__knight(piece)
-        elif piece.key == "queen":
-            return self.__queen(piece)
-        elif piece.key == "king":
-            return self.__king(piece)
-        elif piece.key == "pawn":
-            return self.__pawn(piece)
-
-    def __bishop(self,
-                 piece: Piece) -> [(int, int)]:
-        """
-        Returns all moves for the given bishop
-        :param piece: the given piece
-        :return: [(x, y)]
+        Checks if the side to move has a legal move, stopping at the first one found rather than
+        generating them all. Works from the position alone, the stored moves are left as they are.
+        Castling is never needed, a king that can castle can also step onto the square it passes over
+        :return: bool
         """
-        return self.__trace_diagonals(piece)
+        board = self.__chess.bitboard
+        color = COLOR_IDX[self.__chess.turn]
+        enemy = color ^ 1
+        king_sq = board.king_square(color)
+        checkers = board.attackers(king_sq, enemy)
 
-    def __rook(self,
-               piece: Piece) -> [(int, int)]:
-        """
-        Returns all moves for the given rook
-        :param piece: the given piece
-        :return: [(x, y)]
-        """
-        return self.__trace_vertical_horizontal(piece)
+        # only the king can answer a double check
+        if not checkers & (checkers - 1):
+            if not checkers:
+                evasions = FULL
+            else:
+                evasions = checkers | board.between(king_sq, lowest(checkers))
+            pins = board.pins(king_sq, color)
+            en_passant = self.__en_passant_target()
+
+            for kind in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN):
+                for sq in bits(board.pieces[color][kind]):
+                    targets = board.targets(sq, color, kind, en_passant) & pins.get(sq, FULL)
+                    passant = targets & en_passant if kind == PAWN else 0
+                    if targets & evasions & ~passant:
+                        return True
+                    if passant and not self.__en_passant_exposes_king(sq, lowest(passant), color, king_sq):
+                        return True
+
+        # the king is lifted off the board so it cannot hide behind itself on a checking ray
+        occupied = board.all & ~(1 << king_sq)
+        for target in bits(KING_TARGETS[king_sq] & ~board.occupied[color]):
+            if not board.attackers(target, enemy, occupied):
+                return True
+        return False
+
+    def termination(self) -> str:
+        """
+        Works out if the game is over in the current position. Mate and stalemate come first, so
+        a mate on the fiftieth move still counts
+        :return: str (one of the endings above, None if the game goes on)
+        """
+        chess = self.__chess
+        if not self.has_any_legal_move():
+            board = chess.bitboard
+            color = COLOR_IDX[chess.turn]
+            return CHECKMATE if board.is_attacked(board.king_square(color), color ^ 1) else STALEMATE
+        if chess.is_insufficient_material():
+            return INSUFFICIENT_MATERIAL
+        if chess.is_fifty_moves():
+            return FIFTY_MOVES
+        if chess.is_repetition():
+            return REPETITION
+        return None
+
+    def find_move(self,
+                  start: int,
+                  end: int,
+                  promotion: int = 0) -> int:
+        """
+        Looks a move up in the stored targets and packs it with its flags
+        :param start: the square the piece moves from
+        :param end: the square the piece moves to
+        :param promotion: the kind index a pawn promotes to, 0 for none
+        :return: int (the packed move, 0 if it isn't legal)
+        """
+        x, y = coords(start)
+        piece = self.__chess.board[y][x]
+        if not piece or not self.__current_targets.get(piece.id, 0) >> end & 1:
+            return 0
+
+        color, kind = COLOR_IDX[piece.color], KIND_IDX[piece.key]
+        flags = CAPTURE if self.__chess.bitboard.occupied[color ^ 1] >> end & 1 else 0
+        if kind == PAWN:
+            if self.__en_passant_target() >> end & 1:
+                flags = CAPTURE | EN_PASSANT
+            elif abs(end - start) == SIZE * 2:
+                flags = DOUBLE_PUSH
+            elif PROMOTION_ROWS[color] >> end & 1:
+                return pack(start, end, promotion, flags) if promotion in PROMOTIONS else 0
+        elif kind == KING and abs(end - start) == 2:
+            flags = CASTLE
+        return 0 if promotion else start | (end << TO_SHIFT) | flags
 
-    def __knight(self,
-                 piece: Piece) -> [(int, int)]:
+    def update(self) -> None:
         """
-        Returns all moves for the given knight
-        :param piece: the given piece
-        :return: [(x, y)]
+        Updates all lists of available moves. Each piece's pseudo legal targets are kept between
+        updates and only the pieces touched by what changed on the board are scanned again. Checkers,
+        pins and attacked squares are worked out once for the position and used to filter the
+        stored targets, so a piece whose pin or check status changed is filtered again too.
+        A position already in the cache is taken from it instead
+        :return: None
         """
-        result = []
-        # up left / up right / down left / down right / left up / left down / right up / right down
-        result.extend(self.__check_relative_to_piece(piece, -1, -2))
-        result.extend(self.__check_relative_to_piece(piece, 1, -2))
-        result.extend(self.__check_relative_to_piece(piece, -1, 2))
-        result.extend(self.__check_relative_to_piece(piece, 1, 2))
-        result.extend(self.__check_relative_to_piece(piece, -2, -1))
-        result.extend(self.__check_relative_to_piece(piece, -2, 1))
-        result.extend(self.__check_relative_to_piece(piece, 2, 1))
-        result.extend(self.__check_relative_to_piece(piece, 2, -1))
-        return result
+        cache = self.__cache
+        if cache is not None:
+            entry = cache.probe(self.__chess.hash)
+            if entry is not None:
+                self.__load_entry(entry)
+                return
 
-    def __queen(self,
-                piece: Piece) -> [(int, int)]:
+        self.__current_moves = []
+        self.__current_targets = {}
+        moves = self.__current_moves
+        found = []
+        board = self.__chess.bitboard
+        color = COLOR_IDX[self.__chess.turn]
+        enemy = color ^ 1
+        king_sq = board.king_square(color)
+        en_passant = self.__en_passant_target()
+        self.__refresh(en_passant)
+
+        # squares the other pieces may move to: anything, a capture or block of a single checker, or nothing
+        checkers = board.attackers(king_sq, enemy)
+        self.__checkers = checkers
+        if not checkers:
+            evasions = FULL
+            # no slider is looking at the king, so the stored attacks are the same as with it removed
+            danger = 0
+            for entry in self.__pieces[enemy].values():
+                danger |= entry[1]
+        else:
+            if checkers & (checkers - 1):
+                evasions = 0
+            else:
+                evasions = checkers | board.between(king_sq, lowest(checkers))
+            # the king is removed so it cannot step back along a checking ray
+            danger = board.attacks(enemy, ignore=1 << king_sq)
+
+        pins = board.pins(king_sq, color)
+        enemies = board.occupied[enemy]
+        grid = self.__chess.board
+        pieces = self.__pieces[color]
+        packed = self.__packed[color]
+
+        # walk the bitboards of the side to move rather than scanning the grid
+        for kind, kind_pieces in enumerate(board.pieces[color]):
+            for sq in bits(kind_pieces):
+                targets = pieces[sq][0]
+
+                if kind == KING:
+                    targets &= ~danger
+                    if not checkers:
+                        piece = grid[sq // SIZE][sq % SIZE]
+                        targets |= self.__check_castling(piece, sq, color, -1, danger)
+                        targets |= self.__check_castling(piece, sq, color, 1, danger)
+                else:
+                    # en passant can uncover the king along the row, so it is tested on its own
+                    passant = targets & en_passant if kind == PAWN else 0
+                    targets &= evasions & pins.get(sq, FULL) & ~passant
+                    if passant and not self.__en_passant_exposes_king(sq, lowest(passant), color, king_sq):
+                        targets |= passant
+
+                if targets:
+                    self.__current_targets[grid[sq // SIZE][sq % SIZE].id] = targets
+                    found.append(sq)
+                    found.append(targets)
+                    cached = packed.get(sq)
+                    if cached is None or cached[0] != targets or cached[1] != targets & enemies \
+                            or cached[2] != targets & en_passant:
+                        cached = (targets, targets & enemies, targets & en_passant, [])
+                        self.__pack_moves(cached[3], sq, kind, color, targets, en_passant)
+                        packed[sq] = cached
+                    moves.extend(cached[3])
+
+        if cache is not None:
+            cache.store(self.__chess.hash, moves, found, checkers)
+
+    def __load_entry(self,
+                     entry: (array, array, int)) -> None:
+        """
+        Sets the current moves from a cache entry. Targets are stored by square, as the same
+        position can be reached with different pieces on them
+        :param entry: (moves, targets, checkers)
+        :return: None
         """
-        Returns all moves for the given queen
-        :param piece: the given piece
-        :return: [(x, y)]
+        moves, found, checkers = entry
+        grid = self.__chess.board
+        self.__current_moves = moves.tolist()
+        self.__current_targets = {grid[found[idx] // SIZE][found[idx] % SIZE].id: found[idx + 1]
+                                  for idx in range(0, len(found), 2)}
+        self.__checkers = checkers
+
+    def __refresh(self,
+                  en_passant: int) -> None:
+        """
+        Brings the stored pieces of both colours up to date with the board. The squares that changed
+        since the last update are found by comparing bitboards, so moves, captures, castling, promotions
+        and moves taken back are all picked up. A piece is scanned again if it stands on one of them or
+        one of them is on its rays, jump squares or pawn pushes
+        :param en_passant: bitboard holding the en passant target square
+        :return: None
         """
-        result = []
-        result.extend(self.__trace_diagonals(piece))
-        result.extend(self.__trace_vertical_horizontal(piece))
-        return result
+        board = self.__chess.bitboard
+        snapshot = board.pieces[WHITE] + board.pieces[BLACK] + [en_passant]
+        previous = self.__snapshot
+        self.__snapshot = snapshot
 
-    def __king(self,
-               piece: Piece) -> [(int, int)]:
+        if previous is None or not self.__incremental:
+            changed = FULL
+        else:
+            # an en passant square appearing or going changes what the pawns beside it can take
+            changed = 0
+            for old, new in zip(previous, snapshot):
+                changed |= old ^ new
+            if not changed:
+                return
+
+        for color in (WHITE, BLACK):
+            pieces = self.__pieces[color]
+            packed = self.__packed[color]
+            stale = changed
+            for sq in [sq for sq, entry in pieces.items() if entry[2] & changed]:
+                stale |= 1 << sq
+                del pieces[sq]
+                # the moves stay right for a piece that is still there, whatever happened around it
+                if changed >> sq & 1:
+                    packed.pop(sq, None)
+
+            stale &= board.occupied[color]
+            if stale:
+                for kind, kind_pieces in enumerate(board.pieces[color]):
+                    for sq in bits(kind_pieces & stale):
+                        pieces[sq] = self.__scan(sq, color, kind, en_passant)
+
+    def __scan(self,
+               sq: int,
+               color: int,
+               kind: int,
+               en_passant: int) -> (int, int, int):
+        """
+        Works out what the piece on the given square can do with the board as it is
+        :param sq: the piece's square
+        :param color: the piece's colour index
+        :param kind: the piece's kind index
+        :param en_passant: bitboard holding the en passant target square
+        :return: (pseudo legal targets, attacked squares, squares whose contents decide its targets,
+                  its own square included)
+        """
+        board = self.__chess.bitboard
+        if kind == PAWN:
+            attacks = PAWN_CAPTURES[color][sq]
+            return (board.targets(sq, color, kind, en_passant), attacks,
+                    attacks | PAWN_PUSH_MASKS[color][sq] | (1 << sq))
+        if kind == KNIGHT:
+            attacks = KNIGHT_TARGETS[sq]
+        elif kind == KING:
+            attacks = KING_TARGETS[sq]
+        else:
+            # the rays stop on the first piece either way, so moving it is seen as a change on the ray
+            attacks = ray_attacks(sq, SLIDER_DIRECTIONS[kind], board.all)
+        return attacks & ~board.occupied[color], attacks, attacks | (1 << sq)
+
+    def __pack_moves(self,
+                     moves: [int],
+                     sq: int,
+                     kind: int,
+                     color: int,
+                     targets: int,
+                     en_passant: int) -> None:
+        """
+        Appends a packed move, with its flags, for every target of the piece on the given square
+        :param moves: the list to append to
+        :param sq: the piece's square
+        :param kind: the piece's kind index
+        :param color: the piece's colour index
+        :param targets: bitboard of legal target squares
+        :param en_passant: bitboard holding the en passant target square
+        :return: None
         """
-        Returns all moves for the given king
-        :param piece: the given piece
-        :return: [(x, y)]
+        enemies = self.__chess.bitboard.occupied[color ^ 1]
+
+        for target in bits(targets):
+            flags = CAPTURE if enemies >> target & 1 else 0
+            if kind == PAWN:
+                if en_passant >> target & 1:
+                    flags = CAPTURE | EN_PASSANT
+                elif abs(target - sq) == SIZE * 2:
+                    flags = DOUBLE_PUSH
+                elif PROMOTION_ROWS[color] >> target & 1:
+                    for promotion in PROMOTIONS:
+                        moves.append(pack(sq, target, promotion, flags))
+                    continue
+            elif kind == KING and abs(target - sq) == 2:
+                flags = CASTLE
+            moves.append(sq | (target << TO_SHIFT) | flags)
+
+    def __en_passant_exposes_king(self,
+                                  sq: int,
+                                  target: int,
+                                  color: int,
+                                  king_sq: int) -> bool:
+        """
+        Plays an en passant capture on the bitboards and checks if it leaves the king attacked
+        :param sq: the capturing pawn's square
+        :param target: the en passant target square
+        :param color: the capturing colour index
+        :param king_sq: the capturing side's king square
+        :return: bool
         """
-        result = []
-        result.extend(self.__trace_diagonals(piece, count=1))
-        result.extend(self.__trace_vertical_horizontal(piece, count=1))
-        result.extend(self.__check_castling(piece, -1))
-        result.extend(self.__check_castling(piece, 1))
+        board = self.__chess.bitboard
+        # the captured pawn sits beside the capturing pawn, on the target square's column
+        taken = target - PAWN_DIRECTION[color] * SIZE
+
+        board.remove(sq, color, PAWN)
+        board.remove(taken, color ^ 1, PAWN)
+        board.add(target, color, PAWN)
+        result = board.is_attacked(king_sq, color ^ 1)
+        board.remove(target, color, PAWN)
+        board.add(taken, color ^ 1, PAWN)
+        board.add(sq, color, PAWN)
         return result
 
-    def __pawn(self,
-               piece: Piece) -> [(int, int)]:
+    def __en_passant_target(self) -> int:
         """
-        Returns all moves for the given black pawn
-        :param piece: the given piece
-        :return: [(x, y)]
+        Returns a bitboard holding the square a pawn can take en passant on
+        :return: int
         """
-        result = []
-        y_inc = -1
-
-        if piece.color == "black":
-            y_inc = 1
-
-        # check if the pawn can make the double starting move
-        if not piece.has_moved:
-            result.extend(self.__trace(piece, 0, y_inc, count=2, take_pieces=False))
-        else:
-            result.extend(self.__trace(piece, 0, y_inc, count=1, take_pieces=False))
-
-        # check left and right diagonals
-        for i in range(-1, 2, 2):
-            coords = self.__chess.piece_idx(piece)
-            if coords:
-                x_dia = coords[0] + i
-                y_dia = coords[1] + y_inc
-                x_ep = coords[0] + i
-                y_ep = coords[1]
-
-                if Checker.coords_in_range(x_dia, y_dia):
-                    n_piece = self.__chess.board[y_dia][x_dia]
-                    if n_piece and (n_piece.color != piece.color):
-                        result.append((x_dia, y_dia))
-
-                # check en passent
-                if Checker.coords_in_range(x_ep, y_ep) and \
-                   self.__chess.last_move():
-                    n_piece = self.__chess.piece_at((x_ep, y_ep))
-                    if n_piece and \
-                       n_piece.key == "pawn" and \
-                       n_piece.color != piece.color:
-                        move = self.__chess.last_move()
-                        piece = self.__chess.piece_for_id(move.piece_id)
-                        if piece.key == "pawn" and \
-                           abs(move.start_coords[1] - move.end_coords[1]) == 2:
-                            result.append((x_ep, y_ep + y_inc))
-
-        return result
+        if self.__chess.en_passant:
+            return 1 << square(self.__chess.en_passant[0], self.__chess.en_passant[1])
+        return 0
 
     def __check_castling(self,
                          king: Piece,
-                         inc: int) -> [(int, int)]:
+                         sq: int,
+                         color: int,
+                         inc: int,
+                         danger: int) -> int:
         """
         Checks if the king can make a castling move in the given direction
         :param king: the given king
+        :param sq: the king's square
+        :param color: the king's colour index
         :param inc: -1 or 1 for left and right
-        :return: [(int, int)]
-        """
-        result = []
-
-        if not king.has_moved:
-            coords = self.__chess.piece_idx(king)
-            for x in range(1, configs["board_size"]):
-                if self.coord_in_range(x):
-                    n_piece = self.__chess.piece_at((coords[0] + (inc * x),
-                                                     coords[1]))
-                    if not n_piece:
-                        continue
-                    elif n_piece.color == king.color and \
-                         n_piece.key == "rook" and \
-                         not n_piece.has_moved:
-                        result.append((coords[0] + (inc * 2), coords[1]))
-                        break
-                    else:
-                        break
-
-        return result
-
-    def __trace_diagonals(self,
-                          piece: Piece,
-                          count: int = configs["board_size"]) -> [(int, int)]:
-        """
-        Traces all diagonals from the given piece
-        :param piece: the given piece
-        :param count: how far to count from the given piece
-        :return:
-        """
-        result = []
-        # top left / top right / bottom left / bottom right
-        result.extend(self.__trace(piece, -1, -1, count))
-        result.extend(self.__trace(piece, 1, -1, count))
-        result.extend(self.__trace(piece, -1, 1, count))
-        result.extend(self.__trace(piece, 1, 1, count))
-        return result
-
-    def __trace_vertical_horizontal(self,
-                                    piece: Piece,
-                                    count: int = configs["board_size"]) -> [(int, int)]:
-        """
-        Traces all vertical and horizontal lines from the given piece
-        :param piece: the given piece
-        :param count: how far to count from the given piece
-        :return:
-        """
-        result = []
-        # up / down / left / right
-        result.extend(self.__trace(piece, 0, -1, count))
-        result.extend(self.__trace(piece, 0, 1, count))
-        result.extend(self.__trace(piece, -1, 0, count))
-        result.extend(self.__trace(piece, 1, 0, count))
-        return result
-
-    def __trace(self,
-                piece: Piece,
-                x_inc: int,
-                y_inc: int,
-                count: int,
-                take_pieces: bool = True) -> [(int, int)]:
-        """
-        Traces along the x, y plane from the given piece until it hits the count or another piece
-        :param piece: the given piece
-        :param x_inc: the increment direction on the x plane
-        :param y_inc: the increment direction on the y plane
-        :param count: how far to count from the given piece
-        :param take_pieces: take any opposing colours pieces
-        :return: [(x, y)]
-        """
-        result = []
-        coords = self.__chess.piece_idx(piece)
-        x = coords[0]
-        y = coords[1]
-        step = 0
-
-        # loop until we have hit our total count
-        while step < count:
-            # increment our target x and y positions from the passed incremenets
-            x += x_inc
-            y += y_inc
-            # check our new coordinate is in range
-            if Checker.coords_in_range(x, y):
-                # get the piece at the given position (None if no piece exists)
-                n_piece = self.__chess.piece_at((x, y))
-                if n_piece:
-                    # if we hit an oppenents piece, take it
-                    if (n_piece.color != piece.color) and take_pieces:
-                        result.append((x, y))
-                        return result
-                    # else we have hit our own color and need to return
-                    else:
-                        return result
-                # append the new move if no piece exists at the given coordinate
-                else:
-                    result.append((x, y))
-            # return if we are out of range
-            else:
-                return result
-
-            step += 1
-
-        return result
-
-    def __check_relative_to_piece(self,
-                                  piece: Piece,
-                                  x_inc: int,
-                                  y_inc: int) -> (int, int):
-        """
-        Checks if piece can move to the coordinate x_inc and y_inc from the give piece
-        :param piece:
-        :param x_inc:
-        :param y_inc:
-        :return: (int, int)
-        """
-        result = []
-        coords = self.__chess.piece_idx(piece)
-        x = coords[0] + x_inc
-        y = coords[1] + y_inc
-
-        if Checker.coord_in_range(x) and Checker.coord_in_range(y):
-            n_piece = self.__chess.piece_at((x, y))
-
-            if not n_piece or (n_piece and n_piece.color != piece.color):
-                result.append((x, y))
-                return result
-
-        return result
+        :param danger: bitboard of squares attacked by the opponent
+        :return: bitboard of the castling target square
+        """
+        if king.has_moved:
+            return 0
+
+        # the king may not pass through or land on an attacked square
+        ray = RAYS[sq][0 if inc > 0 else 4]
+        if len(ray) < 2 or ((1 << ray[0]) | (1 << ray[1])) & danger:
+            return 0
+
+        # the first piece along the row must be one of our unmoved rooks
+        board = self.__chess.bitboard
+        for target in ray:
+            if board.all >> target & 1:
+                if board.pieces[color][ROOK] >> target & 1:
+                    x, y = coords(target)
+                    if not self.__chess.board[y][x].has_moved:
+                        return 1 << ray[1]
+                break
+        return 0
 
     @staticmethod
     def coord_in_range(coord: int) -> bool:
@@ -396,7 +468,7 @@ class Checker:
         :param coord:
         :return: boolean
         """
-        return 0 <= coord < configs["board_size"]
+        return 0 <= coord < SIZE
     
     @staticmethod
     def coords_in_range(x: int,
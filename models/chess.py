@@ -1,10 +1,27 @@
 import utils
-from models.move import Move
+from models.bitboard import Bitboard, COLOR_IDX, COLORS, KIND_IDX, KINDS, LIGHT_SQUARES, BISHOP, KNIGHT, PAWN, QUEEN, \
+    ROOK, bits, coords, square
+from models.geometry import PAWN_CAPTURES, name_square, square_name
+from models.evaluation import ENDGAME_SCORES, MIDDLEGAME_SCORES, PHASE_WEIGHTS
+from models.zobrist import BLACK_TO_MOVE, CASTLING_KEYS, EN_PASSANT_KEYS, PIECE_KEYS
+from models.move import Move, move_from
 from models.piece import Piece
 from configs import configs
 from factory import Factory
 
-DEFAULT_START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR"
+DEFAULT_START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# castling rights bit mask
+WHITE_KING_SIDE = 1
+WHITE_QUEEN_SIDE = 2
+BLACK_KING_SIDE = 4
+BLACK_QUEEN_SIDE = 8
+
+# moves without a capture or pawn move before the game is drawn, counted in plies
+FIFTY_MOVE_PLIES = 100
+
+# castling rights in FEN order with their FEN letters
+CASTLING_LETTERS = [(WHITE_KING_SIDE, "K"), (WHITE_QUEEN_SIDE, "Q"), (BLACK_KING_SIDE, "k"), (BLACK_QUEEN_SIDE, "q")]
 
 
 class Chess:
@@ -20,29 +37,174 @@ class Chess:
         self.removed = []               # list of all removed pieces
         self.picked_up = None           # the currently picked up piece
         self.last_position = None       # the position of the picked up piece
-        self.turn = "white"             # the current players turn
+        self.turn = turn                # the current players turn
         self.history = []               # stores [Move]
         self.white_king = None          # pointer to the white king
         self.black_king = None          # pointer to the black king
         self.pawn_promotion = False     # flag that is set when a pawn is ready for a promotion
+        self.bitboard = Bitboard()      # bitboard mirror of the board used for move generation
+        self.positions = {}             # piece.id -> (x, y) for every piece on the board
+        self.pieces_by_id = {}          # piece.id -> Piece for every piece, including removed pieces
+        self.en_passant = None          # (x, y) a pawn can take en passant on, None if there isn't one
+        self.undo_stack = []            # state needed to reverse every move in history
+        self.prior_hashes = []          # hashes of the positions before undo_stack starts, oldest first
+        self.factory = None             # factory used to create promoted pieces
+        self.castling = 0               # castling rights bit mask
+        self.hash = 0                   # zobrist key, updated on every board change
+        self.middlegame = 0             # white minus black middlegame material and piece-square score
+        self.endgame = 0                # white minus black endgame material and piece-square score
+        self.phase = 0                  # sum of PHASE_WEIGHTS for the pieces on the board
+        self.halfmove_clock = 0         # moves since the last capture or pawn move, for the fifty-move rule
+        self.fullmove_number = 1        # starts at 1 and goes up after every black move
 
     def load_board(self,
                    factory: Factory,
                    fe_notation: str = DEFAULT_START) -> None:
         """
-        Loads the board from the given FEN
+        Loads the board from the given FEN. The side to move, castling, en passant and
+        move clock fields are applied when present
         :param factory: the factory to use
         :param fe_notation: the given FEN
         :return: None
         """
+        fields = fe_notation.split()
+
         # load the board using the factory method
-        self.board = factory.create_board(fe_notation)
+        self.factory = factory
+        self.board = factory.create_board(fields[0])
+        self.__index_board()
+
+        if len(fields) > 1:
+            self.turn = "white" if fields[1] == "w" else "black"
+        if len(fields) > 2:
+            self.__load_castling(fields[2])
+        if len(fields) > 3 and fields[3] != "-":
+            self.en_passant = coords(name_square(fields[3]))
+        if len(fields) > 4:
+            self.halfmove_clock = int(fields[4])
+        if len(fields) > 5:
+            self.fullmove_number = int(fields[5])
+
+        self.castling = self.castling_rights()
+        self.hash = self.compute_hash()
+        self.middlegame, self.endgame, self.phase = self.compute_scores()
+
+    def to_fen(self) -> str:
+        """
+        Returns the position as a FEN with all six fields
+        :return: str
+        """
+        castling = "".join(letter for right, letter in CASTLING_LETTERS if self.castling & right)
+        en_passant = square_name(square(self.en_passant[0], self.en_passant[1])) if self.en_passant else "-"
+        return " ".join((Factory.to_fen_string(self.board),
+                         "w" if self.turn == "white" else "b",
+                         castling or "-",
+                         en_passant,
+                         str(self.halfmove_clock),
+                         str(self.fullmove_number)))
+
+    def state(self) -> tuple:
+        """
+        Returns the position as a compact tuple of ints, cheap to pickle and send to another process.
+        The hashes of the positions since the last capture or pawn move are kept for draw detection
+        :return: (bitboards by color then kind, turn index, castling rights, en passant square or -1,
+                  halfmove clock, hashes of the earlier positions, oldest first)
+        """
+        pieces = tuple(board for kinds in self.bitboard.pieces for board in kinds)
+        en_passant = square(self.en_passant[0], self.en_passant[1]) if self.en_passant else -1
+        stack = self.undo_stack[max(len(self.undo_stack) - self.halfmove_clock, 0):]
+        prior = self.prior_hashes[max(len(self.prior_hashes) - (self.halfmove_clock - len(stack)), 0):]
+        hashes = tuple(prior) + tuple(record[11] for record in stack)
+        return pieces, COLOR_IDX[self.turn], self.castling, en_passant, self.halfmove_clock, hashes
+
+    def load_state(self,
+                   factory: Factory,
+                   state: tuple) -> None:
+        """
+        Loads the board from a tuple returned by state()
+        :param factory: the factory to use
+        :param state: the given state
+        :return: None
+        """
+        pieces, turn, castling, en_passant, halfmove_clock, hashes = state
+
+        # create a piece for every bit set in the bitboards
+        self.factory = factory
+        self.board = [[None for x in range(configs["board_size"])] for y in range(configs["board_size"])]
+        for idx, board in enumerate(pieces):
+            color, kind = divmod(idx, len(KINDS))
+            for sq in bits(board):
+                x, y = coords(sq)
+                self.board[y][x] = factory.create_piece(KINDS[kind], COLORS[color])
+        self.__index_board()
+
+        self.turn = COLORS[turn]
+        self.__load_castling("".join(letter for right, letter in CASTLING_LETTERS if castling & right))
+        if en_passant >= 0:
+            self.en_passant = coords(en_passant)
+        self.halfmove_clock = halfmove_clock
+        self.prior_hashes = list(hashes)
+
+        self.castling = self.castling_rights()
+        self.hash = self.compute_hash()
+        self.middlegame, self.endgame, self.phase = self.compute_scores()
+
+    def clone(self) -> 'Chess':
+        """
+        Returns an independent copy of the position and its history. Pieces and moves are copied
+        field by field rather than deep copied, and the factory is shared so new ids stay unique
+        :return: Chess
+        """
+        result = Chess.__new__(Chess)
+        # every piece ever on the board is in pieces_by_id, copy each once and map the rest through it
+        pieces = {piece_id: piece.copy() for piece_id, piece in self.pieces_by_id.items()}
+        moves = {id(move): move.copy() for move in self.history}
+
+        def same(piece: Piece) -> Piece:
+            return pieces[piece.id] if piece else None
 
-        # iterate the board and append all pieces to the list
+        result.board = [[same(piece) for piece in row] for row in self.board]
+        result.pieces = [pieces[piece.id] for piece in self.pieces]
+        result.removed = [pieces[piece.id] for piece in self.removed]
+        result.picked_up = same(self.picked_up)
+        result.last_position = self.last_position
+        result.turn = self.turn
+        result.history = [moves[id(move)] for move in self.history]
+        result.white_king = same(self.white_king)
+        result.black_king = same(self.black_king)
+        result.pawn_promotion = self.pawn_promotion
+        result.bitboard = self.bitboard.copy()
+        result.positions = dict(self.positions)
+        result.pieces_by_id = pieces
+        result.en_passant = self.en_passant
+        result.prior_hashes = list(self.prior_hashes)
+        result.undo_stack = [[moves[id(record[0])], same(record[1]), record[2], record[3], same(record[4])] +
+                             record[5:8] + [same(record[8])] + record[9:]
+                             for record in self.undo_stack]
+        result.factory = self.factory
+        result.castling = self.castling
+        result.hash = self.hash
+        result.middlegame = self.middlegame
+        result.endgame = self.endgame
+        result.phase = self.phase
+        result.halfmove_clock = self.halfmove_clock
+        result.fullmove_number = self.fullmove_number
+        return result
+
+    def __index_board(self) -> None:
+        """
+        Fills the piece lists, position index, bitboards and king pointers from the board
+        :return: None
+        """
+        # iterate the board and append all pieces to the list and bitboards
         for y in range(configs["board_size"]):
             for x in range(configs["board_size"]):
-                if self.board[y][x]:
-                    self.pieces.append(self.board[y][x])
+                piece = self.board[y][x]
+                if piece:
+                    self.pieces.append(piece)
+                    self.pieces_by_id[piece.id] = piece
+                    self.positions[piece.id] = (x, y)
+                    self.bitboard.add(square(x, y), COLOR_IDX[piece.color], KIND_IDX[piece.key])
 
         # find the two kings and set the pointer
         for piece in self.pieces:
@@ -51,6 +213,91 @@ class Chess:
             elif piece.key == "king" and piece.color == "black":
                 self.black_king = piece
 
+    def castling_rights(self) -> int:
+        """
+        Works out the castling rights bit mask from the has_moved flags of the kings and corner rooks
+        :return: int
+        """
+        result = 0
+        size = configs["board_size"]
+        for color, row, king_side, queen_side in (("white", size - 1, WHITE_KING_SIDE, WHITE_QUEEN_SIDE),
+                                                  ("black", 0, BLACK_KING_SIDE, BLACK_QUEEN_SIDE)):
+            king = self.get_king(color)
+            if not king or king.has_moved:
+                continue
+            for x, right in ((size - 1, king_side), (0, queen_side)):
+                rook = self.board[row][x]
+                if rook and rook.key == "rook" and rook.color == color and not rook.has_moved:
+                    result |= right
+        return result
+
+    def compute_hash(self) -> int:
+        """
+        Computes the zobrist key of the position from scratch, used to check the incremental key
+        :return: int
+        """
+        result = CASTLING_KEYS[self.castling_rights()]
+        for color, kinds in enumerate(self.bitboard.pieces):
+            for kind, pieces in enumerate(kinds):
+                for sq in bits(pieces):
+                    result ^= PIECE_KEYS[color][kind][sq]
+        if self.turn == "black":
+            result ^= BLACK_TO_MOVE
+        return result ^ self.en_passant_key()
+
+    def en_passant_key(self) -> int:
+        """
+        Returns the zobrist key of the en passant square. It is only part of the position when a
+        pawn of the side to move stands beside the pushed pawn, otherwise the same position reached
+        without the double push would hash differently
+        :return: int (0 if no pawn can take en passant)
+        """
+        if not self.en_passant:
+            return 0
+        color = COLOR_IDX[self.turn]
+        target = square(self.en_passant[0], self.en_passant[1])
+        # the squares a pawn of the side to move would take on the target from
+        if PAWN_CAPTURES[color ^ 1][target] & self.bitboard.pieces[color][PAWN]:
+            return EN_PASSANT_KEYS[self.en_passant[0]]
+        return 0
+
+    def compute_scores(self) -> (int, int, int):
+        """
+        Computes the evaluation scores from scratch, used to check the incremental scores
+        :return: (middlegame, endgame, phase)
+        """
+        middlegame = 0
+        endgame = 0
+        phase = 0
+        for color, kinds in enumerate(self.bitboard.pieces):
+            for kind, pieces in enumerate(kinds):
+                for sq in bits(pieces):
+                    middlegame += MIDDLEGAME_SCORES[color][kind][sq]
+                    endgame += ENDGAME_SCORES[color][kind][sq]
+                    phase += PHASE_WEIGHTS[kind]
+        return middlegame, endgame, phase
+
+    def __load_castling(self,
+                        rights: str) -> None:
+        """
+        Sets the has_moved flags of the kings and rooks from a FEN castling field. A rook
+        keeps its castling right only while it sits unmoved in its corner
+        :param rights: the given castling field, eg. KQkq
+        :return: None
+        """
+        size = configs["board_size"]
+        for color, row, king_side, queen_side in (("white", size - 1, "K", "Q"), ("black", 0, "k", "q")):
+            # a side without a king can't castle, as in castling_rights
+            king = self.get_king(color)
+            if not king:
+                continue
+            king.has_moved = king_side not in rights and queen_side not in rights
+
+            for sq in bits(self.bitboard.pieces[COLOR_IDX[color]][ROOK]):
+                x, y = coords(sq)
+                self.board[y][x].has_moved = not (y == row and ((x == size - 1 and king_side in rights) or
+                                                                (x == 0 and queen_side in rights)))
+
     def piece_idx(self,
                   piece: Piece) -> (int, int):
         """
@@ -61,11 +308,7 @@ class Chess:
         # check the piece isn't currently picked up
         if piece == self.picked_up:
             return self.last_position
-        # iterate the board and find the piece
-        for y in range(configs["board_size"]):
-            for x in range(configs["board_size"]):
-                if self.board[y][x] == piece:
-                    return x, y
+        return self.positions.get(piece.id)
 
     def put_down(self,
                  x: int,
@@ -76,71 +319,152 @@ class Chess:
         :param y: the target y potion
         :return: bool (if successful)
         """
-        move = Move(self.picked_up.id, self.last_position, (x, y), -1)
-
         if (x, y) == self.last_position:
             self.return_piece()
             return False
 
-        move_to = self.board[y][x]
+        # return the piece to where it was picked up so the move is played from there
+        move = Move(self.picked_up.id, self.last_position, (x, y), -1)
+        self.set_piece(self.picked_up, self.last_position)
+        self.picked_up = None
+        self.last_position = None
+        self.make_move(move)
+        return True
+
+    def make_move(self,
+                  move: Move) -> Move:
+        """
+        Plays the given move in place, including captures, castling, en passant and promotion.
+        The state needed to reverse it is pushed onto the undo stack
+        :param move: the given Move, or a packed move int
+        :return: Move
+        """
+        if isinstance(move, int):
+            x, y = coords(move_from(move))
+            move = Move.from_packed(move, self.board[y][x].id)
+
+        sx, sy = move.start_coords
+        ex, ey = move.end_coords
+        piece = self.board[sy][sx]
+        captured = self.board[ey][ex]
+        captured_coord = (ex, ey)
+
+        # a pawn moving diagonally onto an empty square takes en passant
+        if piece.key == "pawn" and not captured and sx != ex:
+            captured_coord = (ex, sy)
+            captured = self.board[sy][ex]
+
+        # find the castling rook before the king moves, it is the first piece along the row
+        rook = None
+        rook_from = None
+        rook_to = None
+        if piece.key == "king" and abs(ex - sx) == 2:
+            inc = 1 if ex > sx else -1
+            rook_x = sx + inc
+            while not self.board[sy][rook_x]:
+                rook_x += inc
+            rook = self.board[sy][rook_x]
+            rook_from = (rook_x, sy)
+            rook_to = (sx + inc, sy)
+
+        # stored as (move, captured piece, captured coord, piece.has_moved, rook, rook from, rook to,
+        #            en passant, promoted piece, pawn promotion, castling rights, hash, halfmove clock)
+        self.undo_stack.append([move, captured, captured_coord, piece.has_moved, rook, rook_from, rook_to,
+                                self.en_passant, None, self.pawn_promotion, self.castling, self.hash,
+                                self.halfmove_clock])
+        # taken out before the board changes, as it depends on the pawns around the square
+        self.hash ^= self.en_passant_key()
+
+        # captures and pawn moves reset the fifty-move count
+        if captured or piece.key == "pawn":
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if piece.color == "black":
+            self.fullmove_number += 1
 
         # remove the piece at the coordinate if it exists
-        if move_to:
-            self.removed.append(move_to)
-            self.set_piece(None, (x, y))
-            move.took_piece = move_to.id
+        if captured:
+            self.set_piece(None, captured_coord)
+            self.removed.append(captured)
+            move.took_piece = captured.id
 
         # place the piece
-        self.board[y][x] = self.picked_up
-        self.picked_up.has_moved = True
-
-        # check castling case condition
-        if self.picked_up.key == "king":
-            # check castled left
-            if x < self.last_position[0] - 1:
-                rook = self.board[y][0]
-                self.board[y][0] = None
-                self.board[y][self.last_position[0] - 1] = rook
-                rook.has_moved = True
-            # check castled right
-            elif x > self.last_position[0] + 1:
-                rook = self.board[y][configs["board_size"] - 1]
-                self.board[y][configs["board_size"] - 1] = None
-                self.board[y][self.last_position[0] + 1] = rook
-                rook.has_moved = True
-
-        # check en passent and pawn promotion case condition
-        if self.picked_up.key == "pawn":
-            if self.picked_up.color == "white":
-                # en passent
-                coord = (x, y + 1)
-                piece = self.piece_at(coord)
-                if piece and piece.key == "pawn" and \
-                   self.last_move().piece_id == piece.id:
-                    self.removed.append(piece)
-                    self.set_piece(None, coord)
-                    move.took_piece = piece.id
-                # pawn promotion
-                if y == 0:
-                    self.pawn_promotion = True
-            else:
-                # en passent
-                coord = (x, y - 1)
-                piece = self.piece_at(coord)
-                if piece and piece.key == "pawn" and \
-                   self.last_move().piece_id == piece.id:
-                    self.removed.append(piece)
-                    self.set_piece(None, coord)
-                    move.took_piece = piece.id
-                # pawn promotion
-                if y == configs["board_size"] - 1:
+        self.set_piece(None, (sx, sy))
+        self.set_piece(piece, (ex, ey))
+        piece.has_moved = True
+
+        if rook:
+            self.set_piece(None, rook_from)
+            self.set_piece(rook, rook_to)
+            rook.has_moved = True
+
+        # rights can only be lost when a king or rook moves, or a rook is taken
+        if piece.key == "king" or piece.key == "rook" or (captured and captured.key == "rook"):
+            castling = self.castling_rights()
+            self.hash ^= CASTLING_KEYS[self.castling] ^ CASTLING_KEYS[castling]
+            self.castling = castling
+
+        # a double pawn push leaves the square it passed over open to en passant
+        self.en_passant = None
+        if piece.key == "pawn":
+            if abs(ey - sy) == 2:
+                self.en_passant = (sx, (sy + ey) // 2)
+            elif ey == 0 or ey == configs["board_size"] - 1:
+                # promote straight away if the move says to, otherwise wait for replace_with_new_piece
+                if move.promotion:
+                    promoted = self.factory.create_piece(move.promotion, piece.color)
+                    promoted.has_moved = True
+                    self.replace_with_new_piece(promoted, (ex, ey))
+                else:
                     self.pawn_promotion = True
 
         self.history.append(move)
-        self.picked_up = None
-        self.last_position = None
         self.next_turn()
-        return True
+        self.hash ^= self.en_passant_key()
+        return move
+
+    def unmake_move(self) -> Move:
+        """
+        Reverses the last move played with make_move, restoring the position exactly
+        :return: Move
+        """
+        move, captured, captured_coord, has_moved, rook, rook_from, rook_to, \
+            en_passant, promoted, pawn_promotion, castling, zobrist, halfmove_clock = self.undo_stack.pop()
+        self.history.pop()
+        self.next_turn()
+
+        piece = self.pieces_by_id[move.piece_id]
+
+        # swap a promoted piece back for the pawn
+        if promoted:
+            self.removed.pop()
+            self.pieces.pop()
+            del self.pieces_by_id[promoted.id]
+
+        self.set_piece(None, move.end_coords)
+        self.set_piece(piece, move.start_coords)
+        piece.has_moved = has_moved
+
+        if rook:
+            self.set_piece(None, rook_to)
+            self.set_piece(rook, rook_from)
+            rook.has_moved = False
+
+        if captured:
+            self.removed.pop()
+            self.set_piece(captured, captured_coord)
+            move.took_piece = -1
+
+        self.en_passant = en_passant
+        self.pawn_promotion = pawn_promotion
+        # the pieces put back above have already restored their keys, the rest is simpler to copy back
+        self.castling = castling
+        self.hash = zobrist
+        self.halfmove_clock = halfmove_clock
+        if piece.color == "black":
+            self.fullmove_number -= 1
+        return move
 
     def pickup(self,
                x: int,
@@ -152,7 +476,7 @@ class Chess:
         :return: None
         """
         self.picked_up = self.board[y][x]
-        self.board[y][x] = None
+        self.set_piece(None, (x, y))
         self.last_position = (x, y)
         return self.picked_up
 
@@ -190,6 +514,7 @@ class Chess:
         :return: str
         """
         self.turn = utils.invert_team_color(self.turn)
+        self.hash ^= BLACK_TO_MOVE
         return self.turn
 
     def pieces_for_color(self,
@@ -200,11 +525,9 @@ class Chess:
         :return: [Piece]
         """
         result = []
-        for y in range(configs["board_size"]):
-            for x in range(configs["board_size"]):
-                piece = self.piece_at((x, y))
-                if piece and color == piece.color:
-                    result.append(piece)
+        for sq in bits(self.bitboard.occupied[COLOR_IDX[color]]):
+            x, y = coords(sq)
+            result.append(self.board[y][x])
         return result
 
     def piece_at(self,
@@ -223,13 +546,7 @@ class Chess:
         :param piece_id: the given id
         :return: Piece
         """
-        for piece in self.pieces:
-            if piece_id == piece.id:
-                return piece
-
-        for piece in self.removed:
-            if piece_id == piece.id:
-                return piece
+        return self.pieces_by_id.get(piece_id)
 
     def replace_with_new_piece(self,
                                piece: Piece,
@@ -243,8 +560,15 @@ class Chess:
         to_replace = self.piece_at(coords)
         self.removed.append(to_replace)
         self.pieces.append(piece)
+        self.pieces_by_id[piece.id] = piece
         self.set_piece(piece, coords)
 
+        # record the promotion against the move that reached the back row so unmake_move reverses it
+        if self.undo_stack:
+            record = self.undo_stack[-1]
+            if record[0].end_coords == tuple(coords) and record[0].piece_id == to_replace.id:
+                record[8] = piece
+
     def set_piece(self,
                   piece: Piece,
                   coord: (int, int)) -> None:
@@ -254,7 +578,74 @@ class Chess:
         :param coord: the given coord
         :return: None
         """
-        self.board[coord[1]][coord[0]] = piece
+        # keep the bitboards and position index in step with the grid
+        x, y = coord
+        sq = square(x, y)
+        current = self.board[y][x]
+        if current:
+            color, kind = COLOR_IDX[current.color], KIND_IDX[current.key]
+            self.bitboard.remove(sq, color, kind)
+            self.hash ^= PIECE_KEYS[color][kind][sq]
+            self.middlegame -= MIDDLEGAME_SCORES[color][kind][sq]
+            self.endgame -= ENDGAME_SCORES[color][kind][sq]
+            self.phase -= PHASE_WEIGHTS[kind]
+            if self.positions.get(current.id) == (x, y):
+                del self.positions[current.id]
+        if piece:
+            color, kind = COLOR_IDX[piece.color], KIND_IDX[piece.key]
+            self.bitboard.add(sq, color, kind)
+            self.hash ^= PIECE_KEYS[color][kind][sq]
+            self.middlegame += MIDDLEGAME_SCORES[color][kind][sq]
+            self.endgame += ENDGAME_SCORES[color][kind][sq]
+            self.phase += PHASE_WEIGHTS[kind]
+            self.positions[piece.id] = (x, y)
+
+        self.board[y][x] = piece
+
+    def is_repetition(self,
+                      count: int = 3) -> bool:
+        """
+        Checks if the position has now been reached the given number of times. Positions are
+        compared by hash, so they only match with the same castling and en passant rights, and
+        only the positions since the last capture or pawn move with the same side to move are looked at
+        :param count: the number of times the position must have been reached
+        :return: bool
+        """
+        stack = self.undo_stack
+        prior = self.prior_hashes
+        # prior_hashes come first, then undo_stack[idx] holds the hash of the position the idx-th move was played from
+        start = len(prior)
+        oldest = max(start + len(stack) - self.halfmove_clock, 0)
+        seen = 1
+        for idx in range(start + len(stack) - 2, oldest - 1, -2):
+            if (stack[idx - start][11] if idx >= start else prior[idx]) == self.hash:
+                seen += 1
+                if seen >= count:
+                    return True
+        return False
+
+    def is_fifty_moves(self) -> bool:
+        """
+        Checks if fifty moves each have been played without a capture or pawn move
+        :return: bool
+        """
+        return self.halfmove_clock >= FIFTY_MOVE_PLIES
+
+    def is_insufficient_material(self) -> bool:
+        """
+        Checks if neither side has the material left to mate: kings with at most one knight or
+        bishop between them, or with only bishops all on the same colour squares
+        :return: bool
+        """
+        white, black = self.bitboard.pieces
+        if white[PAWN] | black[PAWN] | white[ROOK] | black[ROOK] | white[QUEEN] | black[QUEEN]:
+            return False
+        minors = white[KNIGHT] | black[KNIGHT] | white[BISHOP] | black[BISHOP]
+        if not minors & (minors - 1):
+            return True
+        if white[KNIGHT] | black[KNIGHT]:
+            return False
+        return not minors & LIGHT_SQUARES or not minors & ~LIGHT_SQUARES
 
     def get_king(self,
                  color: str) -> Piece:
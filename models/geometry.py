@@ -0,0 +1,141 @@
+from configs import configs
+
+"""
+Per square lookup tables, built once at import for the configured board size.
+Squares are indexed as y * board_size + x, so square 0 is board[0][0] (the top left
+cell, A8) and the last square is the bottom right cell (H1)
+"""
+SIZE = configs["board_size"]
+SQUARES = SIZE * SIZE
+FULL = (1 << SQUARES) - 1
+
+"""
+The eight ray directions as (dx, dy). The first four run towards higher square indices,
+and the opposite of direction d is d ^ 4
+"""
+DIRECTIONS = [(1, 0), (-1, 1), (0, 1), (1, 1), (-1, 0), (1, -1), (0, -1), (-1, -1)]
+ORTHOGONAL_DIRECTIONS = [0, 2, 4, 6]
+DIAGONAL_DIRECTIONS = [1, 3, 5, 7]
+
+KNIGHT_STEPS = [(-1, -2), (1, -2), (-1, 2), (1, 2), (-2, -1), (-2, 1), (2, 1), (2, -1)]
+# white pawns move up the board (-y), black pawns down
+PAWN_DIRECTION = [-1, 1]
+
+# column letters used when naming squares, rows are numbered from the bottom of the board
+FILE_NAMES = "abcdefghijklmnopqrstuvwxyz"[:SIZE]
+
+
+def square(x: int,
+           y: int) -> int:
+    """
+    Returns the square index for the given board coordinate
+    :param x: the given x value
+    :param y: the given y value
+    :return: int
+    """
+    return y * SIZE + x
+
+
+def coords(sq: int) -> (int, int):
+    """
+    Returns the board coordinate for the given square index
+    :param sq: the given square
+    :return: (int, int)
+    """
+    return sq % SIZE, sq // SIZE
+
+
+def square_name(sq: int) -> str:
+    """
+    Returns the algebraic name of the given square, eg. e4
+    :param sq: the given square
+    :return: str
+    """
+    return FILE_NAMES[sq % SIZE] + str(SIZE - sq // SIZE)
+
+
+def name_square(name: str) -> int:
+    """
+    Returns the square for the given algebraic name, eg. e4
+    :param name: the given square name
+    :return: int
+    """
+    return square(FILE_NAMES.index(name[0]), SIZE - int(name[1:]))
+
+
+def _on_board(x: int,
+              y: int) -> bool:
+    """
+    Bounds check used while building the tables
+    :param x: the given x value
+    :param y: the given y value
+    :return: bool
+    """
+    return 0 <= x < SIZE and 0 <= y < SIZE
+
+
+def _jumps(sq: int,
+           steps: [(int, int)]) -> int:
+    """
+    Returns a bitboard of the squares reached by each of the given steps
+    :param sq: the start square
+    :param steps: the (dx, dy) steps
+    :return: int
+    """
+    x, y = coords(sq)
+    return sum(1 << square(x + dx, y + dy) for dx, dy in steps if _on_board(x + dx, y + dy))
+
+
+def _ray(sq: int,
+         direction: (int, int)) -> [int]:
+    """
+    Returns the squares from the given square to the edge of the board, nearest first
+    :param sq: the start square
+    :param direction: the (dx, dy) direction
+    :return: [int]
+    """
+    result = []
+    x, y = coords(sq)
+    x, y = x + direction[0], y + direction[1]
+    while _on_board(x, y):
+        result.append(square(x, y))
+        x, y = x + direction[0], y + direction[1]
+    return result
+
+
+def _pawn_pushes(sq: int,
+                 color: int) -> [int]:
+    """
+    Returns the single push square and, from the starting row, the double push square
+    :param sq: the pawn's square
+    :param color: the pawn's colour index
+    :return: [int]
+    """
+    x, y = coords(sq)
+    dy = PAWN_DIRECTION[color]
+    start = SIZE - 2 if dy < 0 else 1
+    if not _on_board(x, y + dy):
+        return []
+    if y == start:
+        return [square(x, y + dy), square(x, y + dy * 2)]
+    return [square(x, y + dy)]
+
+
+# RAYS[sq][d] lists the squares outward from sq, RAY_MASKS[sq][d] holds the same squares as a bitboard
+RAYS = [[_ray(sq, direction) for direction in DIRECTIONS] for sq in range(SQUARES)]
+RAY_MASKS = [[sum(1 << target for target in ray) for ray in rays] for rays in RAYS]
+
+KNIGHT_TARGETS = [_jumps(sq, KNIGHT_STEPS) for sq in range(SQUARES)]
+KING_TARGETS = [_jumps(sq, DIRECTIONS) for sq in range(SQUARES)]
+
+# indexed [color][sq]
+PAWN_PUSHES = [[_pawn_pushes(sq, color) for sq in range(SQUARES)] for color in range(2)]
+PAWN_CAPTURES = [[_jumps(sq, [(-1, dy), (1, dy)]) for sq in range(SQUARES)] for dy in PAWN_DIRECTION]
+PAWN_PUSH_MASKS = [[sum(1 << target for target in pushes) for pushes in squares] for squares in PAWN_PUSHES]
+
+# BETWEEN[a][b] holds the squares strictly between two squares on a shared line, 0 if there is none
+BETWEEN = [[0] * SQUARES for sq in range(SQUARES)]
+for _sq in range(SQUARES):
+    for _ray_squares in RAYS[_sq]:
+        for _idx, _target in enumerate(_ray_squares):
+            BETWEEN[_sq][_target] = sum(1 << between for between in _ray_squares[:_idx])
@@ -1,19 +1,139 @@
+from models.bitboard import KINDS
+from models.geometry import SQUARES, coords, square, square_name
+
+"""
+Packed moves hold a whole move in one int, laid out from the lowest bit as
+[from square][to square][promotion kind, 3 bits][flags, 4 bits]
+The promotion kind indexes bitboard.KINDS and is 0 for no promotion (a pawn never becomes a king)
+"""
+SQUARE_BITS = (SQUARES - 1).bit_length()
+SQUARE_MASK = (1 << SQUARE_BITS) - 1
+TO_SHIFT = SQUARE_BITS
+PROMOTION_SHIFT = SQUARE_BITS * 2
+FLAG_SHIFT = PROMOTION_SHIFT + 3
+
+# the letter appended to a promotion in coordinate notation
+PROMOTION_LETTERS = {"queen": "q", "rook": "r", "bishop": "b", "knight": "n"}
+
+# move flags
+CAPTURE = 1 << FLAG_SHIFT
+EN_PASSANT = 2 << FLAG_SHIFT
+CASTLE = 4 << FLAG_SHIFT
+DOUBLE_PUSH = 8 << FLAG_SHIFT
+
+
+def pack(from_sq: int,
+         to_sq: int,
+         promotion: int = 0,
+         flags: int = 0) -> int:
+    """
+    Packs a move into a single int
+    :param from_sq: the square the piece moves from
+    :param to_sq: the square the piece moves to
+    :param promotion: the kind index the pawn promotes to, 0 for none
+    :param flags: any of CAPTURE, EN_PASSANT, CASTLE and DOUBLE_PUSH
+    :return: int
+    """
+    return from_sq | (to_sq << TO_SHIFT) | (promotion << PROMOTION_SHIFT) | flags
+
+
+def move_from(packed: int) -> int:
+    """
+    Returns the square a packed move starts on
+    :param packed: the given packed move
+    :return: int
+    """
+    return packed & SQUARE_MASK
+
+
+def move_to(packed: int) -> int:
+    """
+    Returns the square a packed move ends on
+    :param packed: the given packed move
+    :return: int
+    """
+    return (packed >> TO_SHIFT) & SQUARE_MASK
+
+
+def move_promotion(packed: int) -> int:
+    """
+    Returns the kind index a packed move promotes to, 0 for none
+    :param packed: the given packed move
+    :return: int
+    """
+    return (packed >> PROMOTION_SHIFT) & 7
+
+
+def to_uci(packed: int) -> str:
+    """
+    Returns a packed move in coordinate notation, eg. e2e4 or e7e8q
+    :param packed: the given packed move
+    :return: str
+    """
+    promotion = move_promotion(packed)
+    result = square_name(move_from(packed)) + square_name(move_to(packed))
+    if promotion:
+        result += PROMOTION_LETTERS[KINDS[promotion]]
+    return result
+
 
 class Move:
 
+    __slots__ = ("piece_id", "start_coords", "end_coords", "took_piece", "promotion")
+
     def __init__(self,
                  piece_id: int,
                  start_coords: (int, int),
                  end_coords: (int, int),
-                 took_piece: int = -1):
+                 took_piece: int = -1,
+                 promotion: str = None):
         """
         Contstructor for the move object
         :param piece_id: the given piece id
         :param start_coords: the start coordinates for the move
         :param end_coords: the end coordinates for the move
         :param took_piece: the id of the taken piece, -1 if not piece taken
+        :param promotion: the key of the piece a pawn promotes to, None to choose later
         """
         self.piece_id = piece_id
         self.start_coords = start_coords
         self.end_coords = end_coords
         self.took_piece = took_piece
+        self.promotion = promotion
+
+    def to_packed(self,
+                  flags: int = 0) -> int:
+        """
+        Returns the move as a packed int. The capture flag is set from took_piece, any others are passed in
+        :param flags: extra flags to set
+        :return: int
+        """
+        if self.took_piece != -1:
+            flags |= CAPTURE
+        return pack(square(self.start_coords[0], self.start_coords[1]),
+                    square(self.end_coords[0], self.end_coords[1]),
+                    KINDS.index(self.promotion) if self.promotion else 0,
+                    flags)
+
+    def copy(self) -> 'Move':
+        """
+        Returns a new move with the same fields
+        :return: Move
+        """
+        return Move(self.piece_id, self.start_coords, self.end_coords, self.took_piece, self.promotion)
+
+    @staticmethod
+    def from_packed(packed: int,
+                    piece_id: int) -> 'Move':
+        """
+        Builds a move object from a packed move
+        :param packed: the given packed move
+        :param piece_id: the id of the piece making the move
+        :return: Move
+        """
+        promotion = move_promotion(packed)
+        return Move(piece_id,
+                    coords(move_from(packed)),
+                    coords(move_to(packed)),
+                    -1,
+                    KINDS[promotion] if promotion else None)
@@ -0,0 +1,93 @@
+import sys
+from array import array
+from collections import OrderedDict
+
+"""
+Each entry holds a position's legal moves, as [packed move], its pieces' targets, as
+[square, bitboard of target squares, ...], and the bitboard of pieces giving check.
+Sizes are estimated from the arrays plus a fixed cost for the key, tuple and dict slot
+"""
+ENTRY_OVERHEAD = 256
+
+
+class MoveCache:
+    """
+    Least recently used cache of the legal moves worked out by Checker, keyed by Chess.hash.
+    The key covers the side to move, the castling rights and the en passant square, so the
+    same placement with different rights is stored as a different position
+    """
+
+    def __init__(self,
+                 size_mb: float = 8):
+        """
+        :param size_mb: the most memory the entries may take up, in megabytes
+        """
+        self.capacity = int(size_mb * 1024 * 1024)
+        self.size = 0                   # estimated bytes used by the entries
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()    # stored as {key: (moves, targets, checkers, size)}, oldest first
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def clear(self) -> None:
+        """
+        Empties the cache and resets the counters
+        :return: None
+        """
+        self.entries.clear()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self) -> float:
+        """
+        Returns the share of lookups that found their position
+        :return: float
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def probe(self,
+              key: int) -> (array, array, int):
+        """
+        Looks up the given position, marking it as the most recently used
+        :param key: the position's zobrist key
+        :return: (moves, targets, checkers), or None if the position isn't stored
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0], entry[1], entry[2]
+
+    def store(self,
+              key: int,
+              moves: [int],
+              targets: [int],
+              checkers: int) -> None:
+        """
+        Stores a position's moves, dropping the least recently used positions until it fits
+        :param key: the position's zobrist key
+        :param moves: the packed legal moves
+        :param targets: the pieces' squares each followed by their target squares
+        :param checkers: bitboard of the pieces giving check
+        :return: None
+        """
+        moves = array("I", moves)
+        targets = array("Q", targets)
+        size = sys.getsizeof(moves) + sys.getsizeof(targets) + ENTRY_OVERHEAD
+        if size > self.capacity:
+            return
+
+        entries = self.entries
+        previous = entries.pop(key, None)
+        if previous is not None:
+            self.size -= previous[3]
+        while self.size + size > self.capacity:
+            self.size -= entries.popitem(last=False)[1][3]
+        entries[key] = (moves, targets, checkers, size)
+        self.size += size
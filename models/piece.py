@@ -1,17 +1,17 @@
 
 class Piece:
 
-    def __init__(self, id, key, img, color, has_moved):
+    __slots__ = ("id", "key", "color", "has_moved")
+
+    def __init__(self, id, key, color, has_moved):
         """
         :param id: unique piece identifier
         :param key: the pieces type
-        :param img: bitmap image
         :param color: the pieces color (white / black)
         :param has_moved: set to true on first move
         """
         self.id = id
         self.key = key
-        self.img = img
         self.color = color
         self.has_moved = has_moved
 
@@ -23,3 +23,10 @@ class Piece:
         :return: bool
         """
         return self.color == color
+
+    def copy(self) -> 'Piece':
+        """
+        Returns a new piece with the same id and state
+        :return: Piece
+        """
+        return Piece(self.id, self.key, self.color, self.has_moved)
@@ -0,0 +1,168 @@
+import re
+from models.bitboard import COLOR_IDX, FILES, KIND_IDX, PAWN, ROWS, bits, coords
+from models.checker import Checker
+from models.chess import Chess
+from models.geometry import FILE_NAMES, SIZE, name_square, square, square_name
+from models.move import CAPTURE, CASTLE, move_from, move_promotion, move_to
+
+"""
+Standard Algebraic Notation, eg. Nbd7, exd6, O-O, e8=Q+. Moves are written and read against
+the legal moves of the position, so disambiguation only uses what is really needed
+"""
+
+# the SAN letter of each kind, indexed by KINDS, pawns have none
+SAN_LETTERS = ["K", "Q", "B", "N", "R", ""]
+LETTER_KINDS = {letter: kind for kind, letter in enumerate(SAN_LETTERS) if letter}
+
+KING_SIDE = "O-O"
+QUEEN_SIDE = "O-O-O"
+
+# [piece letter][from file][from row][x][to square][=promotion], the annotation suffixes are stripped first
+SAN_PATTERN = re.compile(r"^([KQBNR])?([%s])?(\d+)?x?([%s]\d+)(?:=?([QBNR]))?$" % (FILE_NAMES, FILE_NAMES))
+
+
+def kind_at(chess: Chess,
+            sq: int) -> int:
+    """
+    Returns the kind index of the piece on the given square
+    :param chess: the given position
+    :param sq: the given square
+    :return: int
+    """
+    x, y = coords(sq)
+    return KIND_IDX[chess.board[y][x].key]
+
+
+def to_san(chess: Chess,
+           checker: Checker,
+           move: int) -> str:
+    """
+    Writes a move in SAN. The move is played and taken back to add the check or mate suffix
+    :param chess: the position before the move
+    :param checker: the checker, updated for the position
+    :param move: the given packed move
+    :return: str
+    """
+    start, end = move_from(move), move_to(move)
+    kind = kind_at(chess, start)
+
+    if move & CASTLE:
+        result = KING_SIDE if end % SIZE > start % SIZE else QUEEN_SIDE
+    elif kind == PAWN:
+        result = FILE_NAMES[start % SIZE] + "x" if move & CAPTURE else ""
+        result += square_name(end)
+        promotion = move_promotion(move)
+        if promotion:
+            result += "=" + SAN_LETTERS[promotion]
+    else:
+        result = SAN_LETTERS[kind]
+
+        # other pieces of the same kind that can reach the same square
+        target = coords(end)
+        others = [sq for sq in bits(chess.bitboard.pieces[COLOR_IDX[chess.turn]][kind])
+                  if sq != start and checker.can_move(chess.piece_at(coords(sq)), target)]
+        if others:
+            if all(other % SIZE != start % SIZE for other in others):
+                result += FILE_NAMES[start % SIZE]
+            elif all(other // SIZE != start // SIZE for other in others):
+                result += square_name(start)[1:]
+            else:
+                result += square_name(start)
+
+        if move & CAPTURE:
+            result += "x"
+        result += square_name(end)
+
+    return result + check_suffix(chess, move)
+
+
+def check_suffix(chess: Chess,
+                 move: int) -> str:
+    """
+    Returns + if the move gives check, # if it gives mate, otherwise nothing
+    :param chess: the position before the move
+    :param move: the given packed move
+    :return: str
+    """
+    mover = COLOR_IDX[chess.turn]
+    chess.make_move(move)
+    try:
+        board = chess.bitboard
+        if not board.attackers(board.king_square(mover ^ 1), mover):
+            return ""
+        return "+" if Checker(chess).has_any_legal_move() else "#"
+    finally:
+        chess.unmake_move()
+
+
+def parse_san(chess: Chess,
+              checker: Checker,
+              text: str) -> int:
+    """
+    Finds the legal move written in SAN. Only the pieces of the right kind on the given file
+    or row are looked up in the checker. Check, mate and annotation suffixes are ignored and
+    castling may be written with zeros
+    :param chess: the given position
+    :param checker: the checker, updated for the position
+    :param text: the given SAN
+    :return: int (the packed move)
+    """
+    san = text.rstrip("+#!?")
+    board = chess.bitboard
+    color = COLOR_IDX[chess.turn]
+
+    if san[:1] in ("O", "0"):
+        san = san.replace("0", "O")
+        if san not in (KING_SIDE, QUEEN_SIDE):
+            raise ValueError("invalid SAN %s" % text)
+        start = board.king_square(color)
+        move = checker.find_move(start, start + (2 if san == KING_SIDE else -2))
+        if not move & CASTLE:
+            raise ValueError("illegal move %s" % text)
+        return move
+
+    match = SAN_PATTERN.match(san)
+    if not match:
+        raise ValueError("invalid SAN %s" % text)
+    letter, from_file, from_row, target, promotion = match.groups()
+    candidates = board.pieces[color][LETTER_KINDS[letter] if letter else PAWN]
+    if from_file:
+        candidates &= FILES[FILE_NAMES.index(from_file)]
+    if from_row:
+        candidates &= ROWS[SIZE - int(from_row)]
+    end = name_square(target)
+    promotion = LETTER_KINDS[promotion] if promotion else 0
+
+    found = 0
+    for start in bits(candidates):
+        move = checker.find_move(start, end, promotion)
+        if move:
+            if found:
+                raise ValueError("ambiguous move %s" % text)
+            found = move
+
+    if not found:
+        raise ValueError("illegal move %s" % text)
+    return found
+
+
+def last_move_san(chess: Chess) -> str:
+    """
+    Writes the last move played in SAN. It is worked out on a copy of the position before the
+    move, so the game is left alone and a promotion chosen after the move is picked up too
+    :param chess: the position after the move
+    :return: str
+    """
+    previous = chess.clone()
+    move = previous.unmake_move()
+    checker = Checker(previous)
+    checker.update()
+
+    # a pawn promoted by the selector has been replaced on the board rather than recorded in the move
+    moved = previous.piece_at(move.start_coords)
+    promoted = chess.piece_at(move.end_coords)
+    promotion = KIND_IDX[promoted.key] if moved.key == "pawn" and promoted.key != "pawn" else 0
+
+    start = square(move.start_coords[0], move.start_coords[1])
+    end = square(move.end_coords[0], move.end_coords[1])
+    return to_san(previous, checker, checker.find_move(start, end, promotion))
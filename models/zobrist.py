@@ -0,0 +1,24 @@
+import random
+from models.bitboard import COLORS, KINDS
+from models.geometry import SIZE, SQUARES
+
+# fixed seed so every process, and every run, hashes a position to the same key
+SEED = 0x5EED
+
+"""
+Random 64 bit keys XORed together to identify a position. There is one key per
+(colour, kind, square), one for black to move, one per combination of castling
+rights and one per en passant column
+"""
+_random = random.Random(SEED)
+PIECE_KEYS = [[[_random.getrandbits(64) for sq in range(SQUARES)] for kind in KINDS] for color in COLORS]
+BLACK_TO_MOVE = _random.getrandbits(64)
+_CASTLING_RIGHT_KEYS = [_random.getrandbits(64) for right in range(4)]
+EN_PASSANT_KEYS = [_random.getrandbits(64) for x in range(SIZE)]
+
+# CASTLING_KEYS[rights] combines the key of every right set in the 4 bit rights mask
+CASTLING_KEYS = [0] * 16
+for _rights in range(16):
+    for _right in range(4):
+        if _rights & (1 << _right):
+            CASTLING_KEYS[_rights] ^= _CASTLING_RIGHT_KEYS[_right]
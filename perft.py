@@ -0,0 +1,184 @@
+import argparse
+import sys
+from factory import Factory
+from models.checker import Checker
+from models.chess import Chess
+from models.move import to_uci
+from models.move_cache import MoveCache
+from timer import Timer
+
+"""
+The standard perft positions and their reference node counts, indexed by depth - 1
+https://www.chessprogramming.org/Perft_Results
+"""
+POSITIONS = {
+    "start": ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+              [20, 400, 8902, 197281, 4865609, 119060324]),
+    "kiwipete": ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                 [48, 2039, 97862, 4085603, 193690690]),
+    "position3": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                  [14, 191, 2812, 43238, 674624, 11030083]),
+    "position4": ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                  [6, 264, 9467, 422333, 15833292]),
+    "position5": ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+                  [44, 1486, 62379, 2103487, 89941194]),
+    "position6": ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+                  [46, 2079, 89890, 3894594, 164075551])
+}
+
+
+def load(fen: str,
+         incremental: bool = True,
+         cache: MoveCache = None) -> (Chess, Checker):
+    """
+    Builds a position from the given FEN without any images
+    :param fen: the given FEN
+    :param incremental: if the checker only rescans the pieces each move can affect
+    :param cache: optional cache of legal moves for the checker
+    :return: (Chess, Checker)
+    """
+    chess = Chess()
+    chess.load_board(Factory(), fen)
+    return chess, Checker(chess, incremental, cache)
+
+
+def perft(chess: Chess,
+          checker: Checker,
+          depth: int) -> int:
+    """
+    Counts the leaf nodes of the legal move tree to the given depth
+    :param chess: the given position
+    :param checker: the checker attached to the position
+    :param depth: the given depth
+    :return: int
+    """
+    if depth == 0:
+        return 1
+
+    checker.update()
+    moves = checker.legal_moves()
+    # the final ply is counted straight from the move list
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        chess.make_move(move)
+        nodes += perft(chess, checker, depth - 1)
+        chess.unmake_move()
+    return nodes
+
+
+def divide(chess: Chess,
+           checker: Checker,
+           depth: int) -> {str: int}:
+    """
+    Splits the perft count at the given depth by root move
+    :param chess: the given position
+    :param checker: the checker attached to the position
+    :param depth: the given depth (at least 1)
+    :return: {move: nodes}
+    """
+    result = {}
+    checker.update()
+    for move in checker.legal_moves():
+        chess.make_move(move)
+        result[to_uci(move)] = perft(chess, checker, depth - 1)
+        chess.unmake_move()
+    return result
+
+
+def run_perft(fen: str,
+              depth: int,
+              expected: [int] = None,
+              incremental: bool = True) -> bool:
+    """
+    Runs perft at every depth up to the given depth, printing counts and speed
+    :param fen: the position to search
+    :param depth: the deepest depth to run
+    :param expected: the reference counts, indexed by depth - 1
+    :param incremental: if the checker only rescans the pieces each move can affect
+    :return: bool (if every count matched its reference)
+    """
+    passed = True
+    chess, checker = load(fen, incremental)
+    timer = Timer()
+    print(fen)
+    print("%5s %12s %10s %12s  %s" % ("depth", "nodes", "time (s)", "nodes/s", "result"))
+
+    for current in range(1, depth + 1):
+        timer.start_timer()
+        nodes = perft(chess, checker, current)
+        timer.stop_timer()
+
+        seconds = timer.elapsed_time_s()
+        result = ""
+        if expected and current <= len(expected):
+            if nodes == expected[current - 1]:
+                result = "ok"
+            else:
+                result = "FAIL (expected %d)" % expected[current - 1]
+                passed = False
+        print("%5d %12d %10.4f %12d  %s" % (current, nodes, seconds, nodes / max(seconds, 1e-9), result))
+
+    return passed
+
+
+def run_divide(fen: str,
+               depth: int) -> None:
+    """
+    Prints the divide counts for the given position
+    :param fen: the position to search
+    :param depth: the given depth
+    :return: None
+    """
+    chess, checker = load(fen)
+    timer = Timer()
+    timer.start_timer()
+    counts = divide(chess, checker, depth)
+    timer.stop_timer()
+
+    for move in sorted(counts):
+        print("%s: %d" % (move, counts[move]))
+    total = sum(counts.values())
+    print("\nmoves: %d\nnodes: %d\ntime: %.4fs" % (len(counts), total, timer.elapsed_time_s()))
+
+
+def main() -> int:
+    """
+    Command line entry point
+    :return: int (the exit code)
+    """
+    parser = argparse.ArgumentParser(description="Counts and times legal move generation")
+    parser.add_argument("depth", type=int, help="the depth to search to")
+    parser.add_argument("--fen", help="a FEN to search, overrides --position")
+    parser.add_argument("--position", choices=sorted(POSITIONS),
+                        help="a standard position, all of them when neither this nor --fen are given")
+    parser.add_argument("--divide", action="store_true", help="split the count by root move")
+    parser.add_argument("--full", action="store_true",
+                        help="rescan every piece on each update rather than only those the last move affects")
+    args = parser.parse_args()
+
+    if args.fen:
+        targets = [(args.fen, None)]
+    elif args.position:
+        targets = [POSITIONS[args.position]]
+    else:
+        targets = list(POSITIONS.values())
+
+    passed = True
+    for fen, expected in targets:
+        if args.divide:
+            run_divide(fen, args.depth)
+        else:
+            passed = run_perft(fen, args.depth, expected, not args.full) and passed
+        print()
+
+    if not passed:
+        print("perft counts did not match the reference values")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
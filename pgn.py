@@ -0,0 +1,291 @@
+import argparse
+import codecs
+import re
+import sys
+from factory import Factory
+from models.checker import Checker
+from models.chess import Chess, DEFAULT_START
+from models.san import parse_san, to_san
+from timer import Timer
+
+"""
+Reads and writes games in Portable Game Notation. Files are read a line at a time through
+a buffered binary stream and each game is handed on as soon as it ends, so memory use stays
+the same however big the file is
+"""
+
+# the seven tag roster, written first and in this order
+ROSTER = ["Event", "Site", "Date", "Round", "White", "Black", "Result"]
+RESULTS = {"1-0", "0-1", "1/2-1/2", "*"}
+
+# bytes read from the file at a time
+BUFFER_SIZE = 1 << 20
+
+# movetext lines are kept under 80 characters
+LINE_WIDTH = 79
+
+TAG_PATTERN = re.compile(r'^\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+TAG_ESCAPE = re.compile(r'\\(.)')
+
+# a comment running to the end of the line if it isn't closed, a rest of line comment,
+# a variation bracket, a NAG, a move number, or anything else up to whitespace
+TOKEN_PATTERN = re.compile(r'\{[^}]*\}?|;.*|[()]|\$\d+|\d+\.+|[^\s{}();$]+')
+
+
+class PgnGame:
+    """
+    One game, the main line moves in SAN with any variations dropped
+    """
+
+    def __init__(self):
+        self.headers = {}               # tag name -> value, in the order read
+        self.moves = []                 # SAN of each move played
+        self.comments = []              # stored as (number of moves played before it, text)
+        self.result = "*"               # the result from the movetext
+
+    def fen(self) -> str:
+        """
+        Returns the game's starting position
+        :return: str
+        """
+        return self.headers.get("FEN", DEFAULT_START)
+
+
+def read_games(path: str,
+               encoding: str = "utf-8"):
+    """
+    Yields every game in the given file, one at a time
+    :param path: the given PGN file
+    :param encoding: the file's text encoding, characters that don't decode are replaced.
+                     A byte order mark at the start of a UTF-8 file is dropped
+    :return: generator of PgnGame
+    """
+    if codecs.lookup(encoding).name == "utf-8":
+        encoding = "utf-8-sig"
+    with open(path, "rb", buffering=BUFFER_SIZE) as stream:
+        yield from parse_games(line.decode(encoding, errors="replace") for line in stream)
+
+
+def parse_games(lines):
+    """
+    Yields every game in the given lines of PGN, one at a time
+    :param lines: iterable of str
+    :return: generator of PgnGame
+    """
+    game = None
+    comment = None                      # the lines of a comment still open at the end of a line
+    depth = 0                           # how deeply nested in variations we are
+    in_movetext = False
+
+    for line in lines:
+        # an escaped line is ignored
+        if line.startswith("%"):
+            continue
+
+        start = 0
+        if comment is not None:
+            end = line.find("}")
+            if end < 0:
+                comment.append(line.strip())
+                continue
+            comment.append(line[:end].strip())
+            if not depth:
+                game.comments.append((len(game.moves), " ".join(filter(None, comment))))
+            comment = None
+            start = end + 1
+
+        elif line.startswith("["):
+            match = TAG_PATTERN.match(line)
+            if match:
+                # tags after movetext start the next game
+                if game is None or in_movetext:
+                    if game is not None:
+                        yield game
+                    game = PgnGame()
+                    in_movetext = False
+                    depth = 0
+                game.headers[match.group(1)] = TAG_ESCAPE.sub(r"\1", match.group(2))
+                continue
+
+        if not line.strip():
+            continue
+        if game is None:
+            game = PgnGame()
+        in_movetext = True
+
+        for match in TOKEN_PATTERN.finditer(line, start):
+            token = match.group()
+            first = token[0]
+            if first == "{":
+                if not token.endswith("}"):
+                    comment = [token[1:].strip()]
+                elif not depth:
+                    game.comments.append((len(game.moves), token[1:-1].strip()))
+            elif first == ";":
+                if not depth:
+                    game.comments.append((len(game.moves), token[1:].strip()))
+            elif first == "(":
+                depth += 1
+            elif first == ")":
+                depth -= 1
+            elif depth or first == "$" or token[-1] == ".":
+                continue
+            elif token in RESULTS:
+                game.result = token
+            else:
+                game.moves.append(token)
+
+    if game is not None:
+        yield game
+
+
+def replay(game: PgnGame,
+           factory: Factory = None) -> (Chess, [int]):
+    """
+    Plays a game's moves through the move model
+    :param game: the given game
+    :param factory: the factory to create the pieces with, a new one if not given
+    :return: (the final position, packed moves played)
+    """
+    chess = Chess()
+    chess.load_board(factory if factory else Factory(), game.fen())
+    checker = Checker(chess)
+    moves = []
+    for san in game.moves:
+        checker.update()
+        move = parse_san(chess, checker, san)
+        chess.make_move(move)
+        moves.append(move)
+    return chess, moves
+
+
+def san_moves(fen: str,
+              moves: [int]) -> [str]:
+    """
+    Writes the given packed moves in SAN, replaying them from the given position
+    :param fen: the starting position
+    :param moves: the packed moves played
+    :return: [str]
+    """
+    chess = Chess()
+    chess.load_board(Factory(), fen)
+    checker = Checker(chess)
+    result = []
+    for move in moves:
+        checker.update()
+        result.append(to_san(chess, checker, move))
+        chess.make_move(move)
+    return result
+
+
+class PgnWriter:
+    """
+    Writes games to a PGN stream one at a time, each is flushed once written
+    """
+
+    def __init__(self,
+                 stream):
+        """
+        :param stream: the text stream to write to
+        """
+        self.stream = stream
+        self.games = 0                  # games written so far
+
+    def write_game(self,
+                   headers: dict,
+                   moves: [str],
+                   result: str = "*",
+                   comments: [(int, str)] = None) -> None:
+        """
+        Writes a game. The seven tag roster is written first, with ? for any missing tags, and
+        move numbers follow the FEN tag when there is one
+        :param headers: tag name -> value
+        :param moves: the SAN of each move played
+        :param result: the game's result
+        :param comments: stored as (number of moves played before it, text)
+        :return: None
+        """
+        tags = {name: "?" for name in ROSTER}
+        tags.update(headers)
+        tags["Result"] = result
+        lines = ['[%s "%s"]' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                 for name, value in tags.items()]
+        lines.append("")
+
+        fields = tags.get("FEN", DEFAULT_START).split()
+        black_first = len(fields) > 1 and fields[1] == "b"
+        number = int(fields[5]) if len(fields) > 5 else 1
+
+        # comments are placed after the moves they follow
+        notes = {}
+        for ply, text in comments or []:
+            notes.setdefault(ply, []).append("{%s}" % text.replace("}", ""))
+
+        tokens = list(notes.get(0, []))
+        for idx, move in enumerate(moves):
+            white = (idx + black_first) % 2 == 0
+            if white:
+                tokens.append("%d." % number)
+            elif idx == 0 or idx in notes:
+                tokens.append("%d..." % number)
+            tokens.append(move)
+            if not white:
+                number += 1
+            tokens.extend(notes.get(idx + 1, []))
+        tokens.append(result)
+
+        line = []
+        width = 0
+        for token in tokens:
+            if line and width + 1 + len(token) > LINE_WIDTH:
+                lines.append(" ".join(line))
+                line = []
+                width = 0
+            width += len(token) + (1 if line else 0)
+            line.append(token)
+        lines.append(" ".join(line))
+
+        self.stream.write("\n".join(lines) + "\n\n")
+        self.stream.flush()
+        self.games += 1
+
+
+def main() -> int:
+    """
+    Command line entry point, reads every game in a file and prints how fast they were read.
+    Games that can't be replayed are reported and skipped
+    :return: int (the exit code, 1 if any game was skipped)
+    """
+    parser = argparse.ArgumentParser(description="Reads a PGN file")
+    parser.add_argument("path", help="the PGN file to read")
+    parser.add_argument("--replay", action="store_true", help="play every move through the move model")
+    args = parser.parse_args()
+
+    games = 0
+    plies = 0
+    skipped = 0
+    timer = Timer()
+    timer.start_timer()
+    for game in read_games(args.path):
+        if args.replay:
+            try:
+                replay(game)
+            except ValueError as error:
+                skipped += 1
+                print("game %d (%s) skipped: %s" % (games + skipped, game.headers.get("Event", "?"), error))
+                continue
+        games += 1
+        plies += len(game.moves)
+    timer.stop_timer()
+
+    seconds = max(timer.elapsed_time_s(), 1e-9)
+    print("%d games, %d plies in %.2fs: %.0f games/s, %.0f plies/s" %
+          (games, plies, seconds, games / seconds, plies / seconds))
+    if skipped:
+        print("%d games skipped" % skipped)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
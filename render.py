@@ -1,7 +1,9 @@
 import pygame
 import utils
 from configs import configs
+from factory import IMAGE_IDX
 from models.chess import Chess
+from models.piece import Piece
 from models.selector import Selector
 
 WHITE = (255, 255, 255)
@@ -16,11 +18,13 @@ class Render:
 
     def __init__(self,
                  screen: pygame.surface,
-                 chess: Chess):
+                 chess: Chess,
+                 notation: [str]):
         """
         Constructs our renderer by pre calculating all the screen sizes
         :param screen: the given pygame window
         :param chess: the given game object (pointer)
+        :param notation: the SAN of every move played (pointer)
         """
         self.s = configs["board_size"]               # board size in cells
         self.cs = configs["cell_size"]               # cell size
@@ -34,171 +38,297 @@ class Render:
         # pointers to game objects
         self.screen = screen
         self.chess = chess
+        self.notation = notation
         # load the board png
         self.board_png = utils.load_and_scale("board.png")
+        # piece sprites keyed by (color, key), the pieces themselves only hold their kind and state
+        images = utils.split_image("pieces.png")
+        self.sprites = {(color, key): images[color][idx] for color in images for key, idx in IMAGE_IDX.items()}
         # load the font for drawing the border
         self.border_font = pygame.font.SysFont("arial", int(self.p / 3), bold=True)
         self.display_font = pygame.font.SysFont("arial", configs["output_text_size"], bold=True)
+        self.line_height = self.display_font.get_height() + 5
+        # rendered text keyed by (font, text, colour), so each label is only rendered the first time it is drawn
+        self.glyphs = {}
+        # the background, board and border never change, so they are drawn once and copied from
+        self.static = self.__build_static()
+        # (text, colour) of each move in the output display, added as the moves are played
+        self.history = []
+        # what was drawn last frame, each frame only redraws the regions that differ from it
+        self.cells = None               # (sprite key, highlight colour) of each square, None to redraw everything
+        self.drag = None                # where the picked up piece was drawn
+        self.shown = 0                  # moves drawn in the output display
+        self.result = None              # the result drawn under the moves
+        self.overlay = None             # (sprite keys, selected index) of the selector
+        self.selector = None
+
+    def invalidate(self) -> None:
+        """
+        Makes the next frame redraw the whole screen, eg. once the window has been uncovered
+        :return: None
+        """
+        self.cells = None
 
     def render(self,
                current_moves: (str, [(int, int)]) = None,
-               selector: Selector = None) -> None:
+               selector: Selector = None,
+               result: str = None) -> None:
         """
-        Main render function
+        Main render function. The frame is compared with the last one and only the squares,
+        display lines, dragged piece and selector that changed are redrawn and updated
         :param current_moves: the list of available moves as coordinates
         :param selector: the currently selector
+        :param result: how the game ended, drawn under the moves
         :return: None
         """
-        self.screen.fill(BACKGROUND)
-        self.__draw_board()
-        self.__draw_border()
-
+        cells = self.__cell_state(current_moves)
+        drag = self.__drag_rect()
+        self.__add_history()
+        shown = len(self.history)
+        overlay = (tuple((piece.color, piece.key) for piece in selector.pieces), selector.selected_index) \
+            if selector else None
+
+        if self.cells is None:
+            dirty = [self.screen.get_rect()]
+        else:
+            dirty = [self.__cell_rect(idx) for idx, cell in enumerate(cells) if cell != self.cells[idx]]
+            if drag != self.drag:
+                dirty.extend(rect for rect in (self.drag, drag) if rect)
+            if shown != self.shown or result != self.result:
+                # the new moves and the lines the result moved from and to
+                dirty.extend(self.__line_rect(idx) for idx in range(min(shown, self.shown), max(shown, self.shown) + 1))
+            if overlay != self.overlay:
+                dirty.extend(self.__overlay_rect(len(state[0])) for state in (self.overlay, overlay) if state)
+
+        self.cells = cells
+        self.drag = drag
+        self.shown = shown
+        self.result = result
+        self.overlay = overlay
+        self.selector = selector
+
+        for rect in dirty:
+            self.__redraw(rect)
+        if dirty:
+            pygame.display.update(dirty)
+
+    def __cell_state(self,
+                     current_moves: (str, [(int, int)])) -> [((str, str), tuple)]:
+        """
+        Works out what each square should show
+        :param current_moves: the list of available moves as coordinates
+        :return: [(sprite key or None, highlight colour or None)], indexed y * board size + x
+        """
+        highlights = {}
         if current_moves:
-            self.__draw_current_moves(current_moves)
-
-        self.__draw_display()
-        self.__draw_pieces()
-
-        if selector:
-            self.__draw_selection_overlay(selector)
+            # draw the last move
+            if configs["show_last_move"]:
+                last_move = self.chess.last_move()
+                if last_move:
+                    highlights[tuple(last_move.start_coords)] = LAST_MOVE_HIGHLIGHT
+                    highlights[tuple(last_move.end_coords)] = LAST_MOVE_HIGHLIGHT
+
+            if (configs["show_piece_moves"] and current_moves[0] == "piece") or \
+               (configs["show_team_moves"] and current_moves[0] == "team"):
+                for coord in current_moves[1]:
+                    highlights[tuple(coord)] = HIGHLIGHT_YELLOW
+
+        result = []
+        for y, row in enumerate(self.chess.board):
+            for x, piece in enumerate(row):
+                result.append(((piece.color, piece.key) if piece else None, highlights.get((x, y))))
+        return result
+
+    def __drag_rect(self) -> pygame.Rect:
+        """
+        Returns where the picked up piece is drawn, under the mouse
+        :return: pygame.Rect (None if nothing is picked up)
+        """
+        if not self.chess.picked_up:
+            return None
+        coords = pygame.mouse.get_pos()
+        return pygame.Rect(
+            (coords[0] - (self.cs / 2),
+             coords[1] - (self.cs / 2)),
+            (self.cs,
+             self.cs))
+
+    def __add_history(self) -> None:
+        """
+        Adds a display line for each move played since the last frame. Moves are only ever added
+        to the notation, it is read from the start again if it gets shorter (eg. a new game)
+        :return: None
+        """
+        if len(self.notation) < len(self.history):
+            self.history = []
+        # games start with white to move, so white plays the even moves
+        for idx in range(len(self.history), len(self.notation)):
+            if idx % 2 == 0:
+                self.history.append(("%d. %s" % (idx // 2 + 1, self.notation[idx]), WHITE))
+            else:
+                self.history.append(("%d... %s" % (idx // 2 + 1, self.notation[idx]), BLACK))
 
-        pygame.display.update()
+    def __cell_rect(self,
+                    idx: int) -> pygame.Rect:
+        """
+        Returns the screen rect of the square with the given index
+        :param idx: y * board size + x
+        :return: pygame.Rect
+        """
+        return pygame.Rect(
+            (self.p + (self.cs * (idx % self.s)),
+             self.p + (self.cs * (idx // self.s))),
+            (self.cs,
+             self.cs))
+
+    def __line_rect(self,
+                    idx: int) -> pygame.Rect:
+        """
+        Returns the screen rect of the output display line with the given index
+        :param idx: the line index
+        :return: pygame.Rect
+        """
+        return pygame.Rect(self.ds, self.p + (idx * self.line_height), self.dw, self.line_height)
 
-    def __draw_board(self) -> None:
+    def __overlay_rect(self,
+                       count: int) -> pygame.Rect:
+        """
+        Returns the screen rect of a selector holding the given number of pieces
+        :param count: the number of pieces to choose from
+        :return: pygame.Rect
+        """
+        width = self.cs * count
+        return pygame.Rect(
+            self.p + (self.bs / 2) - (width / 2),
+            self.p + (self.bs / 2) - (self.cs / 2),
+            width,
+            self.cs)
+
+    def __redraw(self,
+                 rect: pygame.Rect) -> None:
         """
-        Draws the board to the screen
+        Redraws every layer of the given region of the screen, drawing is clipped to it
+        :param rect: the given region
         :return: None
         """
-        rect = pygame.Rect(
-            (self.p, self.p),
-            (self.s, self.s))
-        self.screen.blit(self.board_png, rect)
+        self.screen.set_clip(rect)
+        self.screen.blit(self.static, rect, rect)
+        self.__draw_display(rect)
+        self.__draw_cells(rect)
+
+        # render the picked up piece
+        if self.drag and self.drag.colliderect(rect):
+            self.screen.blit(self.sprite(self.chess.picked_up), self.drag)
+
+        if self.selector:
+            self.__draw_selection_overlay(self.selector)
+        self.screen.set_clip(None)
 
-    def __draw_border(self) -> None:
+    def __build_static(self) -> pygame.Surface:
+        """
+        Draws the background, board and border onto a surface the size of the screen
+        :return: pygame.Surface
+        """
+        static = pygame.Surface(self.screen.get_size(), 0, self.screen)
+        static.fill(BACKGROUND)
+        static.blit(self.board_png, (self.p, self.p))
+        self.__draw_border(static)
+        return static
+
+    def __glyph(self,
+                font: pygame.font.Font,
+                text: str,
+                colour: tuple) -> pygame.Surface:
+        """
+        Returns the given text rendered in the given font and colour, rendering it the first time only
+        :param font: the given font
+        :param text: the given text
+        :param colour: the given colour
+        :return: pygame.Surface
+        """
+        key = (font, text, colour)
+        glyph = self.glyphs.get(key)
+        if glyph is None:
+            glyph = font.render(text, True, colour)
+            self.glyphs[key] = glyph
+        return glyph
+
+    def __draw_border(self,
+                      surface: pygame.Surface) -> None:
         """
         Renders the letters and numbers to the boards border
+        :param surface: the surface to draw on
         :return: None
         """
         # iterate across the screen and draw the letters
         for x in range(self.s):
-            label = self.border_font.render(utils.idx_to_letter(x), True, BLACK)
+            label = self.__glyph(self.border_font, utils.idx_to_letter(x), BLACK)
             # get our labels (x, y) position and write it the screen
             x_start = self.p + (x * self.cs)
             y_top = (self.p / 2) - (label.get_height() / 2)
             y_bottom = self.p + self.bs + y_top
             coords = (x_start + (self.cs / 2) - (label.get_width() / 2),
                       y_top)
-            self.screen.blit(label, coords)
+            surface.blit(label, coords)
             coords = (x_start + (self.cs / 2) - (label.get_width() / 2),
                       y_bottom)
-            self.screen.blit(label, coords)
+            surface.blit(label, coords)
 
         # iterate down the screen and draw the numbers
         for y in range(self.s):
             # invert the index draw 8...1
             new_y = (y - self.s + 1) * -1
-            label = self.border_font.render(str(new_y + 1), True, BLACK)
+            label = self.__glyph(self.border_font, str(new_y + 1), BLACK)
 
             y_start = self.p + (new_y * self.cs)
             x_left = (self.p / 2) - (label.get_width() / 2)
             x_right = self.p + self.bs + x_left
             coords = (x_left,
                       y_start + (self.cs / 2) - (label.get_height() / 2))
-            self.screen.blit(label, coords)
+            surface.blit(label, coords)
             coords = (x_right,
                       y_start + (self.cs / 2) - (label.get_height() / 2))
-            self.screen.blit(label, coords)
+            surface.blit(label, coords)
 
-    def __draw_display(self) -> None:
+    def __draw_display(self,
+                       rect: pygame.Rect) -> None:
         """
-        Draws all previous moves to the output display
+        Draws the lines of the output display that fall in the given region
+        :param rect: the region being redrawn
         :return: None
         """
-        for idx, move in enumerate(self.chess.history):
-            piece = self.chess.piece_for_id(move.piece_id)
-            move_string = "%s %s %s" % (piece.key.title(),
-                                        utils.coord_to_notation(move.start_coords),
-                                        utils.coord_to_notation(move.end_coords))
-            if piece.color == "white":
-                label = self.display_font.render(move_string, True, WHITE)
-            else:
-                label = self.display_font.render(move_string, True, BLACK)
-
+        if rect.right <= self.ds:
+            return
+        # the result goes on the line after the last move
+        lines = len(self.history) + (1 if self.result else 0)
+        first = max(0, (rect.top - self.p) // self.line_height)
+        last = min(lines, (rect.bottom - self.p) // self.line_height + 1)
+        for idx in range(first, last):
+            text, colour = self.history[idx] if idx < len(self.history) else (self.result, BLACK)
+            label = self.__glyph(self.display_font, text, colour)
             coords = (self.ds + self.op,
-                      self.p + (idx * (label.get_height() + 5)))
+                      self.p + (idx * self.line_height))
             self.screen.blit(label, coords)
 
-    def __draw_pieces(self) -> None:
-        """
-        Renders every piece to the screen
-        :return: None
-        """
-        # iterate all the pieces and render them
-        for y in range(self.s):
-            for x in range(self.s):
-                piece = self.chess.board[y][x]
-
-                if piece:
-                    rect = pygame.Rect(
-                        (self.p + (self.cs * x),
-                         self.p + (self.cs * y)),
-                        (self.cs,
-                         self.cs))
-                    self.screen.blit(piece.img, rect)
-
-        # render the picked up piece
-        if self.chess.picked_up:
-            coords = pygame.mouse.get_pos()
-            rect = pygame.Rect(
-                (coords[0] - (self.cs / 2),
-                 coords[1] - (self.cs / 2)),
-                (self.cs,
-                 self.cs))
-            self.screen.blit(self.chess.picked_up.img, rect)
-
-    def __draw_current_moves(self,
-                             current_moves: (str, [(int, int)])) -> None:
+    def __draw_cells(self,
+                     rect: pygame.Rect) -> None:
         """
-        Generates an alpha layer and highlights any cells that can be moved to by the player
-        :param current_moves: list of valid move coordinates
+        Draws the highlights and pieces of the squares that fall in the given region
+        :param rect: the region being redrawn
         :return: None
         """
-        # generate the alpha layer
-        s = pygame.Surface((self.sw, self.sh), pygame.SRCALPHA)
-        s.fill((255, 255, 255, 0))
-
-        # draw the last move
-        if configs["show_last_move"]:
-            last_move = self.chess.last_move()
-            if last_move:
-                start = pygame.Rect(
-                    (self.p + (self.cs * last_move.start_coords[0]),
-                     self.p + (self.cs * last_move.start_coords[1])),
-                    (self.cs,
-                     self.cs))
-
-                end = pygame.Rect(
-                    (self.p + (self.cs * last_move.end_coords[0]),
-                     self.p + (self.cs * last_move.end_coords[1])),
-                    (self.cs,
-                     self.cs))
-
-                pygame.draw.rect(s, LAST_MOVE_HIGHLIGHT, start)
-                pygame.draw.rect(s, LAST_MOVE_HIGHLIGHT, end)
-
-        if (configs["show_piece_moves"] and current_moves[0] == "piece") or \
-           (configs["show_team_moves"] and current_moves[0] == "team"):
-
-            for coord in current_moves[1]:
-                rect = pygame.Rect(
-                    (self.p + (self.cs * coord[0]),
-                     self.p + (self.cs * coord[1])),
-                    (self.cs,
-                     self.cs))
-                pygame.draw.rect(s, HIGHLIGHT_YELLOW, rect)
-
-        # write it to our main screen
-        self.screen.blit(s, (0, 0))
+        area = rect.clip(pygame.Rect(self.p, self.p, self.bs, self.bs))
+        if not area.width or not area.height:
+            return
+        for y in range((area.top - self.p) // self.cs, (area.bottom - 1 - self.p) // self.cs + 1):
+            for x in range((area.left - self.p) // self.cs, (area.right - 1 - self.p) // self.cs + 1):
+                idx = y * self.s + x
+                key, highlight = self.cells[idx]
+                cell = self.__cell_rect(idx)
+                if highlight:
+                    self.screen.fill(highlight, cell)
+                if key:
+                    self.screen.blit(self.sprites[key], cell)
 
     def __draw_selection_overlay(self,
                                  selector: Selector) -> None:
@@ -207,14 +337,9 @@ class Render:
         :param selector: the given selector
         :return: None
         """
-        img_size = self.chess.pieces[0].img.get_height()
-
-        width = img_size * len(selector.pieces)
-        height = img_size
-        x_start = self.p + (self.bs / 2) - (width / 2)
-        y_start = self.p + (self.bs / 2) - (height / 2)
-
-        rect = pygame.Rect(x_start, y_start, width, height)
+        img_size = self.cs
+        rect = self.__overlay_rect(len(selector.pieces))
+        x_start, y_start = rect.topleft
 
         pygame.draw.rect(self.screen, WHITE, rect)
         pygame.draw.rect(self.screen, BLACK, rect, 2)
@@ -230,7 +355,16 @@ class Render:
                 pygame.draw.rect(self.screen, HIGHLIGHT_YELLOW, rect)
 
             pygame.draw.rect(self.screen, BLACK, rect, 1)
-            self.screen.blit(piece.img, rect)
+            self.screen.blit(self.sprite(piece), rect)
+
+    def sprite(self,
+               piece: Piece) -> pygame.Surface:
+        """
+        Returns the image to draw for the given piece
+        :param piece: the given piece
+        :return: pygame.Surface
+        """
+        return self.sprites[(piece.color, piece.key)]
 
     def in_board_bounds(self,
                         point: (int, int)) -> bool:
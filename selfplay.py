@@ -0,0 +1,126 @@
+import argparse
+import datetime
+import importlib
+import multiprocessing
+import os
+import random
+import sys
+from headless import DRAW, BLACK_WINS, UNFINISHED, WHITE_WINS, EnginePlayer, HeadlessGame, RandomPlayer
+from models.chess import DEFAULT_START
+from pgn import PgnWriter, san_moves
+from timer import Timer
+
+"""
+Generates self-play games over a process pool, writing each to a PGN file as soon as it
+finishes so a corpus of any size is never held in memory. Game n is played with seed
+seed + n, so any game can be replayed on its own with the same settings
+"""
+
+
+def make_chooser(spec: str,
+                 seed: int,
+                 max_depth: int = None,
+                 node_limit: int = None,
+                 size_mb: float = 16):
+    """
+    Builds a move chooser. Engines search to a fixed depth or node count so their games are
+    repeatable, anything else is imported as module:name and called with the seed
+    :param spec: random, engine or module:name
+    :param seed: the game's seed
+    :param max_depth: the engine's depth per move
+    :param node_limit: the engine's nodes per move
+    :param size_mb: the engine's transposition table size in megabytes
+    :return: the chooser
+    """
+    if spec == "random":
+        return RandomPlayer(seed)
+    if spec == "engine":
+        return EnginePlayer(max_depth=max_depth, node_limit=node_limit, size_mb=size_mb)
+    module, name = spec.split(":")
+    return getattr(importlib.import_module(module), name)(seed)
+
+
+def play_game(task: tuple) -> (int, int, str, str, [str]):
+    """
+    Plays one game in a worker process
+    :param task: (game index, seed, white spec, black spec, fen, max plies, random opening plies,
+                  max depth, node limit, table size)
+    :return: (game index, seed, result, reason, SAN moves)
+    """
+    index, seed, white, black, fen, max_plies, opening, max_depth, node_limit, size_mb = task
+    # the game's seed draws a seed for each chooser and the opening, so no two games share a random stream
+    seeds = random.Random(seed)
+    players = [make_chooser(spec, seeds.getrandbits(64), max_depth, node_limit, size_mb)
+               for spec in (white, black)]
+
+    # the first few plies are random so repeatable engines still play different games
+    opening_player = RandomPlayer(seeds.getrandbits(64))
+    plies = [0]
+
+    def opening_or(player):
+        def choose(chess, checker):
+            plies[0] += 1
+            return opening_player(chess, checker) if plies[0] <= opening else player(chess, checker)
+        return choose
+
+    game = HeadlessGame(opening_or(players[0]), opening_or(players[1]), fen, max_plies)
+    game.play()
+    return index, seed, game.result, game.reason, san_moves(fen, game.moves)
+
+
+def main() -> int:
+    """
+    Command line entry point, plays the games and writes them to the output file
+    :return: int (the exit code)
+    """
+    parser = argparse.ArgumentParser(description="Generates self-play games as PGN")
+    parser.add_argument("output", help="the PGN file to write")
+    parser.add_argument("--games", type=int, default=100, help="the number of games to play")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="the number of worker processes")
+    parser.add_argument("--white", default="engine", help="random, engine or module:name of a chooser factory")
+    parser.add_argument("--black", default="engine", help="random, engine or module:name of a chooser factory")
+    parser.add_argument("--depth", type=int, help="engine depth per move")
+    parser.add_argument("--nodes", type=int, help="engine nodes per move")
+    parser.add_argument("--hash", type=float, default=16, help="engine transposition table size in megabytes")
+    parser.add_argument("--opening-plies", type=int, default=0, help="random plies played before the choosers")
+    parser.add_argument("--fen", default=DEFAULT_START, help="the starting position")
+    parser.add_argument("--max-plies", type=int, default=500, help="moves before a game is left unfinished")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the first game")
+    args = parser.parse_args()
+    if "engine" in (args.white, args.black) and not args.depth and not args.nodes:
+        args.depth = 2
+
+    tasks = ((idx, args.seed + idx, args.white, args.black, args.fen, args.max_plies, args.opening_plies,
+              args.depth, args.nodes, args.hash) for idx in range(args.games))
+    results = {WHITE_WINS: 0, BLACK_WINS: 0, DRAW: 0, UNFINISHED: 0}
+    plies = 0
+    date = datetime.date.today().strftime("%Y.%m.%d")
+
+    timer = Timer()
+    timer.start_timer()
+    with multiprocessing.Pool(args.workers) as pool, open(args.output, "w") as output:
+        writer = PgnWriter(output)
+        # games are written in the order they finish, Round and Seed identify them
+        for index, seed, result, reason, moves in pool.imap_unordered(play_game, tasks):
+            tags = {"Event": "Self-play", "Site": "?", "Date": date, "Round": index + 1,
+                    "White": args.white, "Black": args.black, "Result": result,
+                    "Seed": seed, "PlyCount": len(moves),
+                    "Termination": "unterminated" if result == UNFINISHED else "normal"}
+            if args.fen != DEFAULT_START:
+                tags["SetUp"] = "1"
+                tags["FEN"] = args.fen
+            writer.write_game(tags, moves, result)
+            results[result] += 1
+            plies += len(moves)
+    timer.stop_timer()
+
+    seconds = timer.elapsed_time_s()
+    print("%d games, %d plies in %.2fs: %.2f games/s, %.0f plies/s with %d workers" %
+          (args.games, plies, seconds, args.games / seconds, plies / seconds, args.workers))
+    print("white wins: %d, black wins: %d, draws: %d, unfinished: %d" %
+          (results[WHITE_WINS], results[BLACK_WINS], results[DRAW], results[UNFINISHED]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
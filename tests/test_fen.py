@@ -0,0 +1,16 @@
+import unittest
+from factory import Factory
+from models.chess import Chess
+
+
+class TestFen(unittest.TestCase):
+
+    def test_castling_rights_without_a_king_are_ignored(self):
+        chess = Chess()
+        chess.load_board(Factory(), "8/8/8/8/8/8/8/K7 w KQ - 0 1")
+        self.assertEqual(chess.castling, 0)
+        self.assertEqual(chess.to_fen(), "8/8/8/8/8/8/8/K7 w - - 0 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import os
+import tempfile
+import unittest
+from pgn import read_games, replay
+
+
+class TestPgn(unittest.TestCase):
+
+    def test_byte_order_mark_is_dropped(self):
+        text = '[Event "BOM"]\n[Site "?"]\n[Result "*"]\n\n1. e4 e5 2. Nf3 *\n'
+        with tempfile.NamedTemporaryFile("wb", suffix=".pgn", delete=False) as stream:
+            stream.write(b"\xef\xbb\xbf" + text.encode("utf-8"))
+        try:
+            games = list(read_games(stream.name))
+        finally:
+            os.remove(stream.name)
+
+        self.assertEqual(len(games), 1)
+        self.assertEqual(games[0].headers["Event"], "BOM")
+        self.assertEqual(games[0].moves, ["e4", "e5", "Nf3"])
+        chess, moves = replay(games[0])
+        self.assertEqual(len(moves), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
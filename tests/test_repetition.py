@@ -0,0 +1,74 @@
+import unittest
+from factory import Factory
+from models.checker import REPETITION, Checker
+from models.chess import Chess, DEFAULT_START
+from models.san import parse_san
+
+
+def play(sans: [str]) -> (Chess, Checker):
+    """
+    Plays the given SAN moves from the starting position
+    :param sans: the given moves
+    :return: (Chess, Checker)
+    """
+    chess = Chess()
+    chess.load_board(Factory(), DEFAULT_START)
+    checker = Checker(chess)
+    for san in sans:
+        checker.update()
+        chess.make_move(parse_san(chess, checker, san))
+    checker.update()
+    return chess, checker
+
+
+# the knights go out and back twice after a double push no pawn can take en passant
+SHUFFLE = ["e4", "e5", "Nf3", "Nc6", "Ng1", "Nb8", "Nf3", "Nc6", "Ng1", "Nb8"]
+
+
+class TestRepetition(unittest.TestCase):
+
+    def test_en_passant_square_nobody_can_take_is_not_hashed(self):
+        chess, checker = play(SHUFFLE[:2])
+        after_push = chess.hash
+        self.assertEqual(after_push, chess.compute_hash())
+
+        chess, checker = play(SHUFFLE[:6])
+        self.assertEqual(chess.hash, after_push)
+
+    def test_en_passant_square_that_can_be_taken_is_hashed(self):
+        chess, checker = play(["e4", "a6", "e5", "d5"])
+        self.assertEqual(chess.hash, chess.compute_hash())
+        with_capture = chess.hash
+
+        chess, checker = play(["e4", "a6", "e5", "d5", "Nf3", "Nf6", "Ng1", "Ng8"])
+        self.assertNotEqual(chess.hash, with_capture)
+
+    def test_shuffle_after_double_push_repeats(self):
+        chess, checker = play(SHUFFLE)
+        self.assertTrue(chess.is_repetition(3))
+
+    def test_shuffle_after_double_push_ends_the_game(self):
+        chess, checker = play(SHUFFLE[:-1])
+        self.assertIsNone(checker.termination())
+
+        chess, checker = play(SHUFFLE)
+        self.assertEqual(checker.termination(), REPETITION)
+
+    def test_repetition_survives_state(self):
+        chess, checker = play(SHUFFLE[:-1])
+        loaded = Chess()
+        loaded.load_state(Factory(), chess.state())
+        self.assertEqual(loaded.halfmove_clock, chess.halfmove_clock)
+        self.assertEqual(loaded.hash, chess.hash)
+
+        checker = Checker(loaded)
+        checker.update()
+        loaded.make_move(parse_san(loaded, checker, SHUFFLE[-1]))
+        self.assertTrue(loaded.is_repetition(3))
+        loaded.unmake_move()
+        self.assertTrue(loaded.is_repetition(2))
+        self.assertFalse(loaded.is_repetition(3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+from engine.search import Search
+from engine.transposition import TranspositionTable
+from factory import Factory
+from models.checker import Checker
+from models.chess import Chess
+from models.evaluation import MATE
+from models.move import to_uci
+
+
+class TestSearch(unittest.TestCase):
+
+    def test_mate_at_the_horizon_is_scored_as_mate(self):
+        chess = Chess()
+        chess.load_board(Factory(), "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1")
+        search = Search(chess, Checker(chess), TranspositionTable(1))
+        move = search.search(1)
+        self.assertEqual(to_uci(move), "d1d8")
+        self.assertEqual(search.iterations[-1][1], MATE - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -37,6 +37,23 @@ class Timer:
         self._start = None
         return self._elapsed_time
 
+    def peek_ns(self) -> int:
+        """
+        Returns the time since the timer started without stopping it, raising an exception if it is not running
+        @return: int - the elapsed time so far in nanoseconds
+        """
+        if self._start is None:
+            raise Exception("Timer not running")
+
+        return time.perf_counter_ns() - self._start
+
+    def peek_s(self) -> float:
+        """
+        Returns the time since the timer started in seconds without stopping it
+        @return: float - the elapsed time so far in seconds
+        """
+        return self.peek_ns() / 1000000000
+
     def reset(self):
         """
         Resets the timer and starts it again
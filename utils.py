@@ -1,4 +1,3 @@
-import pygame
 from configs import configs
 
 LETTERS = ["A", "B", "C", "D", "E", "F", "G", "H", "I"]
@@ -12,6 +11,9 @@ def split_image(filename) -> []:
     :param filename: the given filename
     :return [images]:
     """
+    # imported here so the models can be used without pygame installed
+    import pygame
+
     result = {}
 
     img = pygame.image.load("assets/%s" % filename)
@@ -42,6 +44,8 @@ def load_and_scale(filename):
     :param filename: the given filename
     :return: image
     """
+    import pygame
+
     img = pygame.image.load("assets/%s" % filename)
     img = pygame.transform.scale(
         img,
@@ -61,11 +65,12 @@ def idx_to_letter(value) -> str:
 
 def coord_to_notation(coord: (int, int)) -> str:
     """
-    Transforms a board coordinate into a chess notation sting, eg. E4
+    Transforms a board coordinate into a chess notation sting, eg. E4. Rows are counted
+    from the top of the board and ranks from the bottom
     :param coord: the passed board index
     :return: string
     """
-    return idx_to_letter(coord[0]) + str(coord[1] + 1)
+    return idx_to_letter(coord[0]) + str(configs["board_size"] - coord[1])
 
 
 def invert_team_color(value: str) -> str: